@@ -5,11 +5,929 @@ from redbot.core import commands, Config, checks
 import redbot.core.data_manager
 import random
 import os
+import re
 import datetime
 import logging
 import traceback
-import requests
+import aiohttp
 import asyncio
+import bisect
+import functools
+import string
+import unicodedata
+import concurrent.futures
+import csv
+import gzip
+import heapq
+import io
+import json
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict, deque
+from types import MappingProxyType
+from typing import NamedTuple
+
+WARNING_LOCK_STRIPES = 64
+ZERO_WIDTH_CHARACTERS = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u2060\ufeff"), None)
+# Combining marks left over after NFKD, this strips accents and zalgo stacks
+COMBINING_MARKS = {
+    codepoint: None
+    for start, end in ((0x0300, 0x036F), (0x0483, 0x0489), (0x1AB0, 0x1AFF), (0x1DC0, 0x1DFF), (0x20D0, 0x20FF), (0xFE20, 0xFE2F))
+    for codepoint in range(start, end + 1)
+    if unicodedata.combining(chr(codepoint)) or unicodedata.category(chr(codepoint)) in ('Mn', 'Me')
+}
+# Cyrillic, Greek and Armenian lowercase letters that render like Latin ones
+CONFUSABLES = str.maketrans(
+    "\u0430\u0435\u0451\u0456\u0457\u0458\u043a\u043e\u0440\u0441\u0443\u0445\u0455\u0501\u051b\u051d\u04bb\u0578\u057d"
+    "\u03b1\u03b2\u03b5\u03b9\u03ba\u03bd\u03bf\u03c1\u03c4\u03c5\u03c7\u03c9\u0131",
+    "aeeiijkopcyxsdqwhnu"
+    "abeikvoptuxwi"
+)
+NORMALIZE_TEXT_TABLE = {**ZERO_WIDTH_CHARACTERS, **COMBINING_MARKS, **CONFUSABLES}
+# Token view only: punctuation inside words disappears, so b.a.d reads as bad
+NORMALIZE_TOKEN_TABLE = dict.fromkeys(map(ord, string.punctuation), None)
+# Leetspeak folds to letters as well, so b4d reads as bad, but only inside tokens that contain letters
+LEETSPEAK_TOKEN_TABLE = {**NORMALIZE_TOKEN_TABLE, **str.maketrans("013457689@$", "oieastbbgas")}
+# One pass over the text: "discord" then an optionally spaced or spelled out dot, "gg" or "com/invite", the code and any query string
+INVITE_LINK_PATTERN = re.compile(
+    r"discord(?:app)?(?:\s*\.\s*|\s+dot\s+|\s+)(?:gg|com\s*/\s*invite)\s*/\s*[a-z0-9-]+(\S*)"
+)
+SPAM_TRACKED_MEMBERS = 50000
+DUPLICATE_BUCKET_SECONDS = 10
+DUPLICATE_MAX_FINGERPRINTS = 5000
+DUPLICATE_MIN_LENGTH = 10
+RAID_AGE_BUCKETS = (1, 24, 24 * 7, 24 * 30)  # Account age histogram edges in hours
+RAID_AGE_LABELS = ("< 1 hour", "< 1 day", "< 1 week", "< 30 days", "older")
+RAID_TRACKED_JOINS = 1000
+RAID_MIN_DUPLICATE_THRESHOLD = 3
+RAID_MUTE_CONCURRENCY = 5
+RAID_QUEUE_SIZE = 1000
+RAID_QUEUE_PAGE_SIZE = 80  # Snowflake ids per message, stays under the 2000 character limit
+MUTED_ROLE_ROLLOUT_CONCURRENCY = 5
+DEBUG_LOG_QUEUE_SIZE = 10000
+DEBUG_LOG_BATCH_SIZE = 500
+DEBUG_LOG_MAX_BYTES = 5 * 1024 * 1024
+DEBUG_LOG_BACKUP_COUNT = 3
+DEBUG_LOG_READ_BLOCK = 8192
+DEBUG_LOG_PAGE_SIZE = 1700
+DEBUG_LOG_EXPORT_BYTES = 8 * 1024 * 1024
+STATUS_API_URL = "https://discordstatus.com/api/v2"
+STATUS_POLL_INTERVAL = 300
+STATUS_REQUEST_TIMEOUT = 10
+STATUS_BACKOFF_BASE = 30
+STATUS_BACKOFF_MAX = 1800
+STATUS_FANOUT_CONCURRENCY = 10
+NOTICE_BATCH_WINDOW = 2
+NOTICE_DELETE_AFTER = 10
+NOTICE_MAX_MENTIONS = 50  # 50 mentions of up to 22 characters keep a single line well under NOTICE_MAX_LENGTH
+NOTICE_MAX_LENGTH = 2000
+DM_FAILURE_CACHE_SIZE = 10000
+DM_FAILURE_TTL = 3600
+MASS_ACTION_CONCURRENCY = 5
+MASS_ACTION_MAX_TARGETS = 1000
+MASS_ACTION_PROGRESS_INTERVAL = 2
+MASS_ACTION_LABELS = {'ban': ("Banning", "Banned"), 'kick': ("Kicking", "Kicked"), 'mute': ("Muting", "Muted")}
+CLEAN_BULK_DELETE_SIZE = 100  # Discord's bulk delete limit
+CLEAN_BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(hours=1)  # With a margin for long runs
+CLEAN_SINGLE_DELETE_DELAY = 1
+CLEAN_PROGRESS_INTERVAL = 2
+CLEAN_MAX_MESSAGES = 10000
+CLEAN_MIN_SNOWFLAKE = 10 ** 15  # Smaller than any Discord ID, larger numbers are never message counts
+MOD_LOG_PAGE_SIZE = 10
+MOD_LOG_EXPORT_CHUNK = 1000
+MOD_LOG_EXPORT_FIELDS = ('type', 'case_number', 'timestamp', 'moderator_id', 'action', 'user_id', 'reason')
+MOD_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mod_actions (
+    guild_id INTEGER NOT NULL,
+    case_number INTEGER NOT NULL,
+    timestamp REAL,
+    moderator_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    reason TEXT,
+    PRIMARY KEY (guild_id, case_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS mod_actions_user ON mod_actions (guild_id, user_id, case_number);
+CREATE INDEX IF NOT EXISTS mod_actions_moderator ON mod_actions (guild_id, moderator_id, case_number);
+CREATE INDEX IF NOT EXISTS mod_actions_action ON mod_actions (guild_id, action, case_number);
+"""
+
+
+class NormalizedContent(NamedTuple):
+    # text keeps punctuation and digits for link matching, tokens are folded for word filters
+    text: str
+    tokens: tuple
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_content(content):
+    # Cached by content so every filter looking at the same message shares one normalization
+    if content.isascii():
+        text = content.lower()
+    else:
+        text = unicodedata.normalize('NFKD', content).casefold().translate(NORMALIZE_TEXT_TABLE)
+    return NormalizedContent(text, tuple(filter(None, map(normalize_token, text.split()))))
+
+
+def normalize_token(word):
+    # Numbers and symbol runs like 455 or $$ stay as they are, folding them would turn ordinary chat into words
+    if any(character.isalpha() for character in word):
+        return word.translate(LEETSPEAK_TOKEN_TABLE)
+    return word.translate(NORMALIZE_TOKEN_TABLE)
+
+
+def normalize_word(word):
+    return "".join(normalize_content(word).tokens)
+
+
+def contains_invite_link(text):
+    # Expects the text view from normalize_content, lowercased with zero-width characters removed
+    # Cheap substring prefilter, the regex only runs on messages that mention discord at all
+    if "discord" not in text:
+        return False
+    # Event links (`?event=`) are allowed
+    return any("event=" not in match.group(1) for match in INVITE_LINK_PATTERN.finditer(text))
+
+
+class BannedWordMatcher:
+    # Banned words compiled into a hash set so a scan costs one pass over the message tokens
+    __slots__ = ("words",)
+
+    def __init__(self, banned_words):
+        self.words = frozenset(filter(None, map(normalize_word, banned_words)))
+
+    def __bool__(self):
+        return bool(self.words)
+
+    def matches(self, content_words):
+        words = self.words
+        return any(word in words for word in content_words)
+
+
+class Violation(NamedTuple):
+    # Wording used when a filter hit is recorded and reported to the member
+    reason: str
+    description: str
+    repeated: str
+    removal: str
+
+
+BANNED_WORDS_VIOLATION = Violation(
+    reason="Used banned words",
+    description="using banned words",
+    repeated="repeatedly using banned words",
+    removal="containing a banned word"
+)
+INVITE_LINK_VIOLATION = Violation(
+    reason="Sent an invite link",
+    description="sending an invite link",
+    repeated="repeatedly sending invite links",
+    removal="sending an invite link"
+)
+
+
+SPAM_VIOLATION = Violation(
+    reason="Sent messages too quickly",
+    description="sending messages too quickly",
+    repeated="repeatedly spamming messages",
+    removal="sending messages too quickly"
+)
+
+
+class MessageRateWindow:
+    # Ring buffer holding the timestamps of a member's last `size` messages
+    __slots__ = ("timestamps", "index")
+
+    def __init__(self, size):
+        self.timestamps = [float('-inf')] * size
+        self.index = 0
+
+    def hit(self, now, per_seconds):
+        # The slot being overwritten holds the oldest timestamp, so a full window is one comparison
+        oldest = self.timestamps[self.index]
+        self.timestamps[self.index] = now
+        self.index = (self.index + 1) % len(self.timestamps)
+        return now - oldest < per_seconds
+
+    def reset(self):
+        self.timestamps = [float('-inf')] * len(self.timestamps)
+
+
+class SpamDetector:
+    # Per-member rate windows for one guild, the least recently active members are evicted past max_members
+    __slots__ = ("max_messages", "per_seconds", "max_members", "_windows")
+
+    def __init__(self, max_messages, per_seconds, max_members=SPAM_TRACKED_MEMBERS):
+        self.max_messages = max_messages
+        self.per_seconds = per_seconds
+        self.max_members = max_members
+        self._windows = OrderedDict()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def check(self, member_id, now):
+        window = self._windows.get(member_id)
+        if window is None:
+            window = self._windows[member_id] = MessageRateWindow(self.max_messages)
+            if len(self._windows) > self.max_members:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(member_id)
+        if window.hit(now, self.per_seconds):
+            # Start over so one burst is reported once rather than on every following message
+            window.reset()
+            return True
+        return False
+
+
+DUPLICATE_VIOLATION = Violation(
+    reason="Took part in a copypasta flood",
+    description="posting a message many others are flooding",
+    repeated="repeatedly taking part in message floods",
+    removal="being part of a duplicate message flood"
+)
+
+
+class DuplicateDetector:
+    # Counts who posted each message fingerprint in fixed time buckets, message bodies are never stored
+    __slots__ = ("threshold", "window", "_buckets")
+
+    def __init__(self, threshold, window):
+        self.threshold = threshold
+        self.window = window
+        self._buckets = deque()
+
+    def check(self, fingerprint, author_id, now):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+        bucket_start = now - now % DUPLICATE_BUCKET_SECONDS
+        if not self._buckets or self._buckets[-1][0] != bucket_start:
+            self._buckets.append((bucket_start, {}))
+
+        # Most fingerprints are only ever posted once, so a lone author is kept as a
+        # bare id and only promoted to a set when a second member posts the same thing
+        authors_by_fingerprint = self._buckets[-1][1]
+        authors = authors_by_fingerprint.get(fingerprint)
+        if authors is None:
+            if len(authors_by_fingerprint) >= DUPLICATE_MAX_FINGERPRINTS:
+                return False
+            authors_by_fingerprint[fingerprint] = author_id
+        elif isinstance(authors, int):
+            if authors != author_id:
+                authors_by_fingerprint[fingerprint] = {authors, author_id}
+        elif len(authors) < self.threshold:
+            # Author sets stop growing at the threshold, which keeps each entry bounded
+            authors.add(author_id)
+
+        # Distinct members across the whole window, one member repeating a line across buckets counts once.
+        # At most window / DUPLICATE_BUCKET_SECONDS buckets of at most threshold ids each, so this is constant time
+        seen = set()
+        for _, bucket in self._buckets:
+            authors = bucket.get(fingerprint)
+            if authors is None:
+                continue
+            if isinstance(authors, int):
+                seen.add(authors)
+            else:
+                seen.update(authors)
+            if len(seen) >= self.threshold:
+                return True
+        return False
+
+
+class JoinRateMonitor:
+    # Sliding window of recent joins for one guild with a running account-age histogram
+    __slots__ = ("joins", "per_seconds", "cooldown", "active", "since", "queue", "_recent", "_histogram", "_last_busy")
+
+    def __init__(self, joins, per_seconds, cooldown):
+        self.joins = joins
+        self.per_seconds = per_seconds
+        self.cooldown = cooldown
+        self.active = False
+        self.since = None
+        # Members who joined during the raid, kept for bulk moderation
+        self.queue = deque(maxlen=RAID_QUEUE_SIZE)
+        self._recent = deque()
+        self._histogram = [0] * len(RAID_AGE_LABELS)
+        self._last_busy = float('-inf')
+
+    def _expire(self, now):
+        while self._recent and (self._recent[0][0] <= now - self.per_seconds or len(self._recent) > RAID_TRACKED_JOINS):
+            self._histogram[self._recent.popleft()[2]] -= 1
+
+    def record(self, member_id, account_age_hours, now):
+        # Returns True when this join pushes the guild over the threshold and a raid should start
+        self._expire(now)
+        age_bucket = bisect.bisect_right(RAID_AGE_BUCKETS, account_age_hours)
+        self._recent.append((now, member_id, age_bucket))
+        self._histogram[age_bucket] += 1
+        if len(self._recent) >= self.joins:
+            self._last_busy = now
+            return not self.active
+        return False
+
+    def rate(self, now):
+        self._expire(now)
+        return len(self._recent)
+
+    def histogram(self, now):
+        self._expire(now)
+        return list(zip(RAID_AGE_LABELS, self._histogram))
+
+    def recent_member_ids(self):
+        return [member_id for _, member_id, _ in self._recent]
+
+    def start(self, now):
+        self.active = True
+        self.since = now
+        self._last_busy = now
+
+    def stop(self):
+        self.active = False
+        self.since = None
+
+    def should_end(self, now):
+        # Raid mode only lifts once joins stay below the threshold for a full cooldown
+        return self.active and self.rate(now) < self.joins and now - self._last_busy >= self.cooldown
+
+
+class GuildSettings(NamedTuple):
+    # Immutable snapshot of the guild settings read by the on_message hot path
+    enable_debug: bool
+    banned_words: BannedWordMatcher
+    actions: MappingProxyType
+    thresholds: MappingProxyType
+    exempt_roles: frozenset
+    muted_role_id: int
+    spam_filter: MappingProxyType
+    duplicate_filter: MappingProxyType
+    raid_mode: MappingProxyType
+    default_mute_duration: int
+
+    @classmethod
+    def from_config(cls, data):
+        return cls(
+            enable_debug=data['enable_debug'],
+            banned_words=BannedWordMatcher(data['banned_words']),
+            actions=MappingProxyType(dict(data['actions'])),
+            thresholds=MappingProxyType(dict(data['thresholds'])),
+            exempt_roles=frozenset(data['exempt_roles']),
+            muted_role_id=data['muted_role_id'],
+            spam_filter=MappingProxyType(dict(data['spam_filter'])),
+            duplicate_filter=MappingProxyType(dict(data['duplicate_filter'])),
+            raid_mode=MappingProxyType(dict(data['raid_mode'])),
+            default_mute_duration=data['default_mute_duration']
+        )
+
+    def raid_profile(self):
+        # Stricter filters while a raid is underway: invite links always blocked, the spam window doubled
+        # and the flood threshold halved, but never so low that two quick messages in a normal chat trip them
+        threshold = self.duplicate_filter['threshold']
+        return self._replace(
+            actions=MappingProxyType({**self.actions, 'invite_link_filter': True}),
+            spam_filter=MappingProxyType({
+                **self.spam_filter, 'enabled': True, 'per_seconds': self.spam_filter['per_seconds'] * 2
+            }),
+            duplicate_filter=MappingProxyType({
+                **self.duplicate_filter, 'enabled': True, 'threshold': min(threshold, max(RAID_MIN_DUPLICATE_THRESHOLD, threshold // 2))
+            })
+        )
+
+
+class MuteScheduler:
+    # Pending unmutes kept in a min-heap and served by a single timer task
+    def __init__(self, callback):
+        self._callback = callback
+        self._heap = []
+        self._expiries = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def schedule(self, guild_id, member_id, expires_at):
+        self._expiries[(guild_id, member_id)] = expires_at
+        heapq.heappush(self._heap, (expires_at, guild_id, member_id))
+        if self._heap[0][0] == expires_at:
+            # The new expiry is now the earliest one, re-arm the timer
+            self._wakeup.set()
+
+    def cancel(self, guild_id, member_id):
+        # Stale heap entries are skipped when they reach the top
+        self._expiries.pop((guild_id, member_id), None)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, guild_id, member_id = heapq.heappop(self._heap)
+                if self._expiries.get((guild_id, member_id)) != expires_at:
+                    continue
+                del self._expiries[(guild_id, member_id)]
+                asyncio.ensure_future(self._callback(guild_id, member_id))
+
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+
+class DebugLogWriter:
+    # Queues debug lines on the event loop and appends them to per-guild files from a worker thread
+    def __init__(self, directory, max_bytes=DEBUG_LOG_MAX_BYTES, backup_count=DEBUG_LOG_BACKUP_COUNT):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize=DEBUG_LOG_QUEUE_SIZE)
+        self._task = None
+
+    def path_for(self, guild_id):
+        return os.path.join(self.directory, f"{guild_id}-debug.log")
+
+    def paths_for(self, guild_id):
+        # Current file first, then rotated files from newest to oldest
+        path = self.path_for(guild_id)
+        return [path] + [f"{path}.{index}" for index in range(1, self.backup_count + 1)]
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # Whatever is still queued is written synchronously, the loop is going away anyway
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            self._flush(batch)
+
+    def write(self, guild_id, line):
+        try:
+            self._queue.put_nowait((guild_id, line))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < DEBUG_LOG_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await loop.run_in_executor(None, self._flush, batch)
+            except OSError as e:
+                print(f"Error writing debug log: {e}")
+
+    def _flush(self, batch):
+        lines_by_guild = {}
+        for guild_id, line in batch:
+            lines_by_guild.setdefault(guild_id, []).append(line)
+        for guild_id, lines in lines_by_guild.items():
+            path = self.path_for(guild_id)
+            self._rotate(path)
+            with open(path, 'a') as debug_file:
+                debug_file.write("".join(lines))
+
+    def _rotate(self, path):
+        try:
+            if os.path.getsize(path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        os.replace(path, f"{path}.1")
+
+
+def iter_lines_reversed(path, block_size=DEBUG_LOG_READ_BLOCK):
+    # Yield the lines of a file newest first, reading fixed-size blocks backwards from the end
+    try:
+        log_file = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with log_file:
+        log_file.seek(0, os.SEEK_END)
+        position = log_file.tell()
+        remainder = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            log_file.seek(position)
+            lines = (log_file.read(read_size) + remainder).split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode('utf-8', errors='replace')
+        if remainder:
+            yield remainder.decode('utf-8', errors='replace')
+
+
+def iter_debug_log(paths, command=None, since=None, until=None):
+    # Lines are written in time order, so the scan stops at the first line older than `since`
+    for path in paths:
+        for line in iter_lines_reversed(path):
+            if since is not None or until is not None:
+                try:
+                    stamp = datetime.datetime.fromisoformat(line.split(" - ", 1)[0])
+                except ValueError:
+                    continue
+                if since is not None and stamp < since:
+                    return
+                if until is not None and stamp > until:
+                    continue
+            if command is not None and f"Command '{command}'" not in line:
+                continue
+            yield line
+
+
+def read_debug_log_page(paths, page, command=None, since=None, until=None, page_size=DEBUG_LOG_PAGE_SIZE):
+    # Page 1 is the most recent page_size characters of matching lines
+    lines = []
+    size = 0
+    current_page = 1
+    has_more = False
+    for line in iter_debug_log(paths, command, since, until):
+        # Lines can carry arbitrary user input, a single one must still fit on a page
+        if len(line) > page_size:
+            line = line[:page_size - 3] + "..."
+        if lines and size + len(line) + 1 > page_size:
+            if current_page == page:
+                has_more = True
+                break
+            current_page += 1
+            lines = []
+            size = 0
+        lines.append(line)
+        size += len(line) + 1
+    if current_page != page:
+        lines = []
+    return list(reversed(lines)), has_more
+
+
+def export_debug_log(paths, command=None, since=None, until=None, max_bytes=DEBUG_LOG_EXPORT_BYTES):
+    # Gzip the newest matching lines, capped at max_bytes of uncompressed text
+    lines = []
+    size = 0
+    for line in iter_debug_log(paths, command, since, until):
+        size += len(line) + 1
+        if size > max_bytes:
+            break
+        lines.append(line)
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed:
+        for line in reversed(lines):
+            compressed.write(line.encode('utf-8') + b"\n")
+    buffer.seek(0)
+    return buffer, len(lines)
+
+
+class StatusPoller:
+    # Conditional GETs against the status page API, the last payload is reused on 304 Not Modified
+    def __init__(self, session, base_url=STATUS_API_URL):
+        self.session = session
+        self.base_url = base_url
+        self.failures = 0
+        self._etag = None
+        self._last_modified = None
+        self._data = None
+
+    def set_base_url(self, base_url):
+        self.base_url = base_url
+        self._etag = None
+        self._last_modified = None
+        self._data = None
+
+    async def fetch(self):
+        headers = {}
+        if self._data is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+        url = f"{self.base_url.rstrip('/')}/summary.json"
+        async with self.session.get(url, headers=headers) as response:
+            if response.status == 304 and self._data is not None:
+                return self._data
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+            self._etag = response.headers.get('ETag')
+            self._last_modified = response.headers.get('Last-Modified')
+        self._data = data
+        return data
+
+    def next_delay(self):
+        if not self.failures:
+            return STATUS_POLL_INTERVAL
+        # Exponential backoff with jitter so restarted bots do not retry in lockstep
+        delay = min(STATUS_BACKOFF_MAX, STATUS_BACKOFF_BASE * 2 ** (self.failures - 1))
+        return random.uniform(delay / 2, delay)
+
+
+def status_snapshot(data):
+    # Overall description plus {component id: [name, status]}, kept JSON friendly for Config
+    return {
+        'description': data['status']['description'],
+        'components': {component['id']: [component['name'], component['status']] for component in data['components']}
+    }
+
+
+def diff_status(previous, current):
+    # Returns whether the description changed and (name, old status, new status) for each changed component
+    if not isinstance(previous, dict):
+        # last_status used to hold only the description
+        previous = {'description': previous, 'components': {}}
+    old_components = previous.get('components') or {}
+    new_components = current['components']
+    changes = []
+    for component_id, (name, status) in new_components.items():
+        old = old_components.get(component_id)
+        old_status = old[1] if old else None
+        if old_status != status and not (old is None and status == "operational"):
+            changes.append((name, old_status, status))
+    for component_id, (name, status) in old_components.items():
+        if component_id not in new_components:
+            changes.append((name, status, None))
+    return previous.get('description') != current['description'], changes
+
+
+class RemovalNoticeQueue:
+    # Collects "message removed" notices per channel and posts them as one message after a short window
+    def __init__(self, window=NOTICE_BATCH_WINDOW, delete_after=NOTICE_DELETE_AFTER):
+        self.window = window
+        self.delete_after = delete_after
+        self._pending = {}
+        self._tasks = {}
+
+    def add(self, channel, member, reason):
+        pending = self._pending.get(channel.id)
+        if pending is None:
+            pending = self._pending[channel.id] = (channel, {})
+            self._tasks[channel.id] = asyncio.ensure_future(self._flush_later(channel.id))
+        mentions = pending[1].setdefault(reason, [])
+        if member.mention not in mentions:
+            mentions.append(member.mention)
+
+    def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._pending.clear()
+
+    async def _flush_later(self, channel_id):
+        await asyncio.sleep(self.window)
+        self._tasks.pop(channel_id, None)
+        channel, mentions_by_reason = self._pending.pop(channel_id)
+        lines = []
+        for reason, mentions in mentions_by_reason.items():
+            if len(mentions) == 1:
+                lines.append(f'{mentions[0]}, your message has been removed for {reason}.')
+                continue
+            shown = ", ".join(mentions[:NOTICE_MAX_MENTIONS])
+            if len(mentions) > NOTICE_MAX_MENTIONS:
+                shown += f" and {len(mentions) - NOTICE_MAX_MENTIONS} more"
+            lines.append(f'{shown}: your messages have been removed for {reason}.')
+        # Several reasons at full mention count overflow one message, so lines are packed into as many as needed
+        for chunk in self.pack_lines(lines):
+            with contextlib.suppress(discord.HTTPException):
+                await channel.send(chunk, delete_after=self.delete_after)
+
+    @staticmethod
+    def pack_lines(lines, max_length=NOTICE_MAX_LENGTH):
+        chunks = []
+        current = ""
+        for line in lines:
+            if current and len(current) + 1 + len(line) > max_length:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current:
+            chunks.append(current)
+        return chunks
+
+
+class DMFailureCache:
+    # Bounded LRU of user IDs whose DMs were refused, entries expire after ttl seconds
+    __slots__ = ("maxsize", "ttl", "hits", "misses", "_entries")
+
+    def __init__(self, maxsize=DM_FAILURE_CACHE_SIZE, ttl=DM_FAILURE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def should_skip(self, user_id):
+        expires_at = self._entries.get(user_id)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return True
+            del self._entries[user_id]
+        self.misses += 1
+        return False
+
+    def add(self, user_id):
+        self._entries[user_id] = time.monotonic() + self.ttl
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class ModActionLog:
+    # Append-only moderation log in SQLite (WAL mode), all access goes through one worker thread
+    def __init__(self, path):
+        self.path = path
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._connection = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, func, *args)
+
+    def _connect(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(MOD_LOG_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def open(self):
+        await self._run(self._connect)
+
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def _append(self, guild_id, entries):
+        connection = self._connect()
+        with connection:
+            # The primary key index makes this a single b-tree lookup
+            case_number = connection.execute(
+                "SELECT COALESCE(MAX(case_number), 0) FROM mod_actions WHERE guild_id = ?", (guild_id,)
+            ).fetchone()[0]
+            rows = []
+            for entry in entries:
+                case_number += 1
+                rows.append((
+                    guild_id, case_number, entry.get('timestamp'), entry['moderator'],
+                    entry['action'], entry['user'], entry.get('reason')
+                ))
+            connection.executemany(
+                "INSERT INTO mod_actions (guild_id, case_number, timestamp, moderator_id, action, user_id, reason) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return [row[1] for row in rows]
+
+    async def append(self, guild_id, moderator_id, action, user_id, reason):
+        entry = {'timestamp': time.time(), 'moderator': moderator_id, 'action': action, 'user': user_id, 'reason': reason}
+        return (await self._run(self._append, guild_id, [entry]))[0]
+
+    async def append_many(self, guild_id, entries):
+        return await self._run(self._append, guild_id, entries)
+
+    def _query(self, guild_id, user_id, moderator_id, action, limit, offset):
+        clauses = ["guild_id = ?"]
+        params = [guild_id]
+        for column, value in (('user_id', user_id), ('moderator_id', moderator_id), ('action', action)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        params.extend((limit, offset))
+        return self._connect().execute(
+            "SELECT case_number, timestamp, moderator_id, action, user_id, reason FROM mod_actions "
+            f"WHERE {' AND '.join(clauses)} ORDER BY case_number DESC LIMIT ? OFFSET ?",
+            params
+        ).fetchall()
+
+    async def query(self, guild_id, user_id=None, moderator_id=None, action=None, limit=MOD_LOG_PAGE_SIZE, offset=0):
+        return await self._run(self._query, guild_id, user_id, moderator_id, action, limit, offset)
+
+    @staticmethod
+    def _row_writer(output, fmt, header):
+        if fmt == 'csv':
+            writer = csv.DictWriter(output, fieldnames=MOD_LOG_EXPORT_FIELDS)
+            if header:
+                writer.writeheader()
+            return writer.writerow
+
+        def write_row(row):
+            output.write(json.dumps(row) + "\n")
+        return write_row
+
+    def _export(self, guild_id, path, fmt):
+        # Rows are pulled from the cursor in chunks and written straight into the gzip stream
+        cursor = self._connect().execute(
+            "SELECT case_number, timestamp, moderator_id, action, user_id, reason FROM mod_actions "
+            "WHERE guild_id = ? ORDER BY case_number",
+            (guild_id,)
+        )
+        count = 0
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as output:
+            write_row = self._row_writer(output, fmt, header=True)
+            while True:
+                rows = cursor.fetchmany(MOD_LOG_EXPORT_CHUNK)
+                if not rows:
+                    break
+                for case_number, timestamp, moderator_id, action, user_id, reason in rows:
+                    write_row({
+                        'type': 'mod_action', 'case_number': case_number, 'timestamp': timestamp,
+                        'moderator_id': moderator_id, 'action': action, 'user_id': user_id, 'reason': reason
+                    })
+                    count += 1
+        return count
+
+    async def export(self, guild_id, path, fmt):
+        return await self._run(self._export, guild_id, path, fmt)
+
+    def _append_export_rows(self, path, fmt, rows):
+        # Appending adds another gzip member, readers decompress concatenated members as one stream
+        with gzip.open(path, 'at', encoding='utf-8', newline='') as output:
+            write_row = self._row_writer(output, fmt, header=False)
+            for row in rows:
+                write_row(row)
+        return len(rows)
+
+    async def append_export_rows(self, path, fmt, rows):
+        return await self._run(self._append_export_rows, path, fmt, rows)
+
+
+def parse_user_id(arg):
+    # Accepts a raw ID or a user mention
+    arg = arg.strip("<@!>")
+    return int(arg) if arg.isdigit() else None
+
+
+class MassActionOptions(NamedTuple):
+    user_ids: list
+    joined_minutes: int
+    raid_queue: bool
+    duration: int
+    reason: str
+
+
+def parse_mass_action_options(options):
+    # Raises ValueError or IndexError on malformed options
+    user_ids = []
+    joined_minutes = None
+    raid_queue = False
+    duration = None
+    reason = None
+    args = options.split() if options else []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ['-j', '--joined']:
+            joined_minutes = int(args[i + 1])
+            if joined_minutes < 1:
+                raise ValueError(joined_minutes)
+            i += 2
+        elif arg == '--raid':
+            raid_queue = True
+            i += 1
+        elif arg in ['-t', '--time']:
+            duration = int(args[i + 1])
+            i += 2
+        elif arg in ['-r', '--reason']:
+            # Everything after the reason flag is the reason
+            reason = " ".join(args[i + 1:])
+            if not reason:
+                raise ValueError(arg)
+            break
+        else:
+            # Mentions and IDs, optionally as a comma separated list
+            for part in filter(None, arg.split(',')):
+                user_id = parse_user_id(part)
+                if user_id is None:
+                    raise ValueError(part)
+                user_ids.append(user_id)
+            i += 1
+    return MassActionOptions(user_ids, joined_minutes, raid_queue, duration, reason)
+
 
 class VSMod(commands.Cog):
     def __init__(self, bot):
@@ -34,48 +952,285 @@ class VSMod(commands.Cog):
                 'banning_threshold': 7,
                 'muting_time': 5
             },
-            'mod_actions': [],
-            'warnings': {},
+            'mod_actions': [],  # Legacy action list, migrated to the SQLite action log on load
+            'warnings': {},  # Legacy guild-wide warnings, migrated to member scope on load
             'default_mute_duration': 5,
             'enable_debug': False,  # Added enable_debug option
             'suggestion_channel_id': None,
             'status_channel_id': None,
             'last_status': None,
-            'exempt_roles': []
+            'status_edit_mode': False,
+            'status_message_id': None,
+            'exempt_roles': [],
+            'pending_unmutes': {},  # Member ID -> timed mute expiry, read at startup instead of every member record
+            'spam_filter': {
+                'enabled': False,
+                'max_messages': 5,
+                'per_seconds': 5
+            },
+            'duplicate_filter': {
+                'enabled': False,
+                'threshold': 5,
+                'window': 60
+            },
+            'raid_mode': {
+                'enabled': False,
+                'joins': 10,
+                'per_seconds': 10,
+                'cooldown': 300,
+                'alert_channel_id': None
+            }
         }
         self.config.register_guild(**default_guild)
-        self.status_task = self.bot.loop.create_task(self.check_status())
-
-    def cog_unload(self):
+        self.config.register_member(warnings=[])
+        self.config.register_global(schema_version=0, status_api_url=STATUS_API_URL)
+        self._guild_settings = {}
+        self._warning_locks = [asyncio.Lock() for _ in range(WARNING_LOCK_STRIPES)]
+        self.mute_scheduler = MuteScheduler(self.expire_mute)
+        self._rollout_tasks = {}
+        self._muted_roles = {}
+        self.debug_writer = DebugLogWriter(str(current_directory))
+        self.dm_failures = DMFailureCache()
+        self.removal_notices = RemovalNoticeQueue()
+        self._spam_detectors = {}
+        self._duplicate_detectors = {}
+        self._join_monitors = {}
+        self._raid_profiles = {}
+        self._raid_tasks = {}
+        self._clean_tasks = {}
+        self.mod_log = ModActionLog(os.path.join(str(current_directory), "mod_actions.db"))
+        self.http_session = None
+        self.status_poller = None
+        self.status_task = None
+        self._status_channels = {}
+        self._last_status = {}
+        self._status_edit_mode = set()
+        self._status_messages = {}
+
+    async def cog_load(self):
+        await self.mod_log.open()
+        await self.migrate_warnings()
+        await self.migrate_mod_actions()
+        # Load every guild's settings in bulk so on_message never has to wait on Config
+        for guild_id, data in (await self.config.all_guilds()).items():
+            self._guild_settings[guild_id] = GuildSettings.from_config(data)
+            if data['status_channel_id']:
+                self._status_channels[guild_id] = data['status_channel_id']
+                self._last_status[guild_id] = data['last_status']
+                if data['status_edit_mode']:
+                    self._status_edit_mode.add(guild_id)
+                self._status_messages[guild_id] = data['status_message_id']
+            # Re-arm timed mutes that were pending when the bot last stopped
+            for member_id, expires_at in data['pending_unmutes'].items():
+                self.mute_scheduler.schedule(guild_id, int(member_id), expires_at)
+        self.mute_scheduler.start()
+        self.debug_writer.start()
+        self.http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=STATUS_REQUEST_TIMEOUT))
+        self.status_poller = StatusPoller(self.http_session, await self.config.status_api_url())
+        self.status_task = asyncio.ensure_future(self.check_status())
+
+    async def migrate_warnings(self):
+        # One-shot move of the guild-wide warnings dict into per-member records
+        if await self.config.schema_version() >= 1:
+            return
+        for guild_id, data in (await self.config.all_guilds()).items():
+            if not data['warnings']:
+                continue
+            for user_id, user_warnings in data['warnings'].items():
+                if user_warnings:
+                    await self.config.member_from_ids(guild_id, int(user_id)).warnings.set(user_warnings)
+            await self.config.guild_from_id(guild_id).warnings.clear()
+        await self.config.schema_version.set(1)
+
+    async def migrate_mod_actions(self):
+        # One-shot move of the Config mod_actions lists into the SQLite action log
+        if await self.config.schema_version() >= 2:
+            return
+        for guild_id, data in (await self.config.all_guilds()).items():
+            if not data['mod_actions']:
+                continue
+            await self.mod_log.append_many(guild_id, data['mod_actions'])
+            await self.config.guild_from_id(guild_id).mod_actions.clear()
+        await self.config.schema_version.set(2)
+
+    async def cog_unload(self):
         if self.status_task:
             self.status_task.cancel()
+        self.mute_scheduler.stop()
+        self.debug_writer.stop()
+        self.removal_notices.stop()
+        for task in self._rollout_tasks.values():
+            task.cancel()
+        for task in self._raid_tasks.values():
+            task.cancel()
+        for task in self._clean_tasks.values():
+            task.cancel()
+        if self.http_session:
+            await self.http_session.close()
+        await self.mod_log.close()
 
     async def cog_before_invoke(self, ctx):
         if not await self.get_muted_role(ctx.guild):
             await self.create_muted_role(ctx.guild)
 
     async def get_muted_role(self, guild):
-        muted_role_id = await self.config.guild(guild).muted_role_id()
+        # Resolved roles are cached until a role event invalidates them
+        muted_role = self._muted_roles.get(guild.id)
+        if muted_role is not None:
+            return muted_role
+        muted_role_id = (await self.get_settings(guild)).muted_role_id
         if muted_role_id:
-            return discord.utils.get(guild.roles, id=muted_role_id)
+            muted_role = guild.get_role(muted_role_id)
+            if muted_role is not None:
+                self._muted_roles[guild.id] = muted_role
+            return muted_role
         return None
 
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        muted_role = self._muted_roles.get(role.guild.id)
+        if muted_role is not None and muted_role.id == role.id:
+            del self._muted_roles[role.guild.id]
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        muted_role = self._muted_roles.get(after.guild.id)
+        if muted_role is not None and muted_role.id == after.id:
+            self._muted_roles[after.guild.id] = after
+
     async def create_muted_role(self, guild):
         muted_role = discord.utils.get(guild.roles, name="Muted")
-        if not muted_role:
-            try:
+        try:
+            if not muted_role:
                 muted_role = await guild.create_role(name="Muted")
-                for channel in guild.channels:
-                    await channel.set_permissions(muted_role, send_messages=False)
-                await self.config.guild(guild).muted_role_id.set(muted_role.id)
-            except Exception as e:
-                print(f"Error creating muted role: {e}")
+            await self.config.guild(guild).muted_role_id.set(muted_role.id)
+            self.update_settings(guild, muted_role_id=muted_role.id)
+            self._muted_roles[guild.id] = muted_role
+        except Exception as e:
+            print(f"Error creating muted role: {e}")
+            return
+        # Channel overwrites are applied in the background so the invoking command is not held up
+        self.start_muted_role_rollout(guild, muted_role)
+
+    def start_muted_role_rollout(self, guild, muted_role, progress=None):
+        task = self._rollout_tasks.get(guild.id)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self.rollout_muted_role(guild, muted_role, progress))
+            self._rollout_tasks[guild.id] = task
+        return task
+
+    @staticmethod
+    def has_muted_overwrite(channel, muted_role):
+        return channel.overwrites_for(muted_role).send_messages is False
+
+    async def rollout_muted_role(self, guild, muted_role, progress=None):
+        # Channels that already carry the overwrite are skipped, so an interrupted rollout resumes where it stopped
+        synced = {channel.id for channel in guild.channels if channel.category is not None and channel.permissions_synced}
+        categories = [channel for channel in guild.categories if not self.has_muted_overwrite(channel, muted_role)]
+        channels = [
+            channel for channel in guild.channels
+            if not isinstance(channel, discord.CategoryChannel) and not self.has_muted_overwrite(channel, muted_role)
+        ]
+        total = len(categories) + len(channels)
+        done = 0
+        failed = 0
+        failed_categories = set()
+        semaphore = asyncio.Semaphore(MUTED_ROLE_ROLLOUT_CONCURRENCY)
+
+        async def apply(channel):
+            nonlocal done, failed
+            async with semaphore:
+                try:
+                    if channel.id in synced and channel.category_id not in failed_categories:
+                        # Re-sync with the already patched category so the channel keeps following it
+                        await channel.edit(sync_permissions=True)
+                    else:
+                        # Channels under a category that could not be patched get the overwrite directly
+                        await channel.set_permissions(muted_role, send_messages=False)
+                except discord.HTTPException:
+                    failed += 1
+                    if isinstance(channel, discord.CategoryChannel):
+                        failed_categories.add(channel.id)
+                done += 1
+                if progress is not None:
+                    await progress(done, total, failed)
+
+        # Categories go first, synced channels copy their overwrites from them
+        await asyncio.gather(*(apply(category) for category in categories))
+        await asyncio.gather(*(apply(channel) for channel in channels))
+        await self.debug_log(guild, "create_muted_role", f"Muted role applied to {done - failed}/{total} channels, {failed} failed")
+        return done - failed, total
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        muted_role = await self.get_muted_role(channel.guild)
+        # Channels created inside a patched category inherit the overwrite already
+        if muted_role is None or self.has_muted_overwrite(channel, muted_role):
+            return
+        with contextlib.suppress(discord.Forbidden, discord.NotFound):
+            await channel.set_permissions(muted_role, send_messages=False)
+
+    async def get_settings(self, guild):
+        settings = self._guild_settings.get(guild.id)
+        if settings is None:
+            settings = GuildSettings.from_config(await self.config.guild(guild).all())
+            self._guild_settings[guild.id] = settings
+        return settings
+
+    def update_settings(self, guild, **changes):
+        # Mirror a Config write that has already happened into the in-memory snapshot
+        settings = self._guild_settings.get(guild.id)
+        if settings is None:
+            return
+        for key in ('actions', 'thresholds', 'spam_filter', 'duplicate_filter', 'raid_mode'):
+            if key in changes:
+                changes[key] = MappingProxyType({**getattr(settings, key), **changes[key]})
+        settings = self._guild_settings[guild.id] = settings._replace(**changes)
+        if guild.id in self._raid_profiles:
+            self._raid_profiles[guild.id] = settings.raid_profile()
+
+    def warning_lock(self, member):
+        # Members hash onto a fixed pool of locks so updates to one record never interleave
+        return self._warning_locks[hash((member.guild.id, member.id)) % WARNING_LOCK_STRIPES]
+
+    async def add_warning(self, member, reason):
+        async with self.warning_lock(member):
+            async with self.config.member(member).warnings() as user_warnings:
+                user_warnings.append(reason)
+                return len(user_warnings)
+
+    async def remove_warning(self, member, index):
+        async with self.warning_lock(member):
+            async with self.config.member(member).warnings() as user_warnings:
+                if 0 <= index < len(user_warnings):
+                    user_warnings.pop(index)
+                return list(user_warnings)
+
+    async def clear_member_warnings(self, member):
+        async with self.warning_lock(member):
+            if not await self.config.member(member).warnings():
+                return False
+            await self.config.member(member).warnings.clear()
+            return True
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self._guild_settings.pop(guild.id, None)
+        self._muted_roles.pop(guild.id, None)
+        self._spam_detectors.pop(guild.id, None)
+        self._duplicate_detectors.pop(guild.id, None)
+        self._join_monitors.pop(guild.id, None)
+        self._raid_profiles.pop(guild.id, None)
+        task = self._raid_tasks.pop(guild.id, None)
+        if task is not None:
+            task.cancel()
+        self._status_channels.pop(guild.id, None)
+        self._last_status.pop(guild.id, None)
+        self._status_messages.pop(guild.id, None)
+        self._status_edit_mode.discard(guild.id)
 
     async def debug_log(self, guild, command, message):
-        current_directory = redbot.core.data_manager.cog_data_path(cog_instance=self)
-        debug_file_path = f"{current_directory}/{guild.id}-debug.log"
-        with open(debug_file_path, 'a') as debug_file:
-            debug_file.write(f"{datetime.datetime.now()} - Command '{command}': {message}\n")
+        self.debug_writer.write(guild.id, f"{datetime.datetime.now()} - Command '{command}': {message}\n")
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
@@ -179,7 +1334,9 @@ class VSMod(commands.Cog):
         words = [word.strip().lower() for word in words.replace(" ", "").split(",")]
         banned_words = await self.config.guild(ctx.guild).banned_words()
         banned_words.extend(words)
-        await self.config.guild(ctx.guild).banned_words.set(list(set(banned_words)))  # Remove duplicates
+        banned_words = list(set(banned_words))  # Remove duplicates
+        await self.config.guild(ctx.guild).banned_words.set(banned_words)
+        self.update_settings(ctx.guild, banned_words=BannedWordMatcher(banned_words))
         await ctx.send(f'Added {", ".join(words)} to the list of banned words.')
 
     @_banned_words.command()
@@ -192,6 +1349,7 @@ class VSMod(commands.Cog):
         banned_words = await self.config.guild(ctx.guild).banned_words()
         updated_banned_words = [word for word in banned_words if word not in words]
         await self.config.guild(ctx.guild).banned_words.set(updated_banned_words)
+        self.update_settings(ctx.guild, banned_words=BannedWordMatcher(updated_banned_words))
         await ctx.send(f'Removed {", ".join(words)} from the list of banned words.')
 
     @_banned_words.command()
@@ -209,6 +1367,7 @@ class VSMod(commands.Cog):
             await self.debug_log(ctx.guild, "add", "Running 'purge_banned_words' sub-command of '_banned_words' command")
             return
         await self.config.guild(ctx.guild).banned_words.set([])
+        self.update_settings(ctx.guild, banned_words=BannedWordMatcher([]))
         await ctx.send("Banned words list has been purged.")
 
     @_banned_words.group(name="settings")
@@ -277,6 +1436,7 @@ class VSMod(commands.Cog):
         # Set warning threshold
         await self.config.guild(ctx.guild).actions.warning.set(True)
         await self.config.guild(ctx.guild).thresholds.warning_threshold.set(threshold)
+        self.update_settings(ctx.guild, actions={'warning': True}, thresholds={'warning_threshold': threshold})
         await ctx.send(f'Set warning threshold to {threshold}.')
 
     @_mute_bw_settings.command(name="set")
@@ -290,6 +1450,7 @@ class VSMod(commands.Cog):
         await self.config.guild(ctx.guild).actions.muting.set(True)
         await self.config.guild(ctx.guild).thresholds.muting_threshold.set(threshold)
         await self.config.guild(ctx.guild).thresholds.muting_time.set(time)
+        self.update_settings(ctx.guild, actions={'muting': True}, thresholds={'muting_threshold': threshold, 'muting_time': time})
 
         await ctx.send(f'Set mute threshold to {threshold} warnings and mute duration to {time} minutes.')
 
@@ -303,6 +1464,7 @@ class VSMod(commands.Cog):
         # Set banning threshold
         await self.config.guild(ctx.guild).actions.banning.set(True)
         await self.config.guild(ctx.guild).thresholds.banning_threshold.set(threshold)
+        self.update_settings(ctx.guild, actions={'banning': True}, thresholds={'banning_threshold': threshold})
         await ctx.send(f'Set banning threshold to {threshold}.')
 
     # Enable/Disable commands
@@ -315,6 +1477,7 @@ class VSMod(commands.Cog):
 
         # Enable warning threshold
         await self.config.guild(ctx.guild).actions.warning.set(True)
+        self.update_settings(ctx.guild, actions={'warning': True})
         await ctx.send('Warning threshold has been enabled.')
 
     @_warn_bw_settings.command(name="disable")
@@ -326,6 +1489,7 @@ class VSMod(commands.Cog):
 
         # Disable warning threshold
         await self.config.guild(ctx.guild).actions.warning.set(False)
+        self.update_settings(ctx.guild, actions={'warning': False})
         await ctx.send('Warning threshold has been disabled.')
 
     @_mute_bw_settings.command(name="enable")
@@ -337,6 +1501,7 @@ class VSMod(commands.Cog):
 
         # Enable muting threshold
         await self.config.guild(ctx.guild).actions.muting.set(True)
+        self.update_settings(ctx.guild, actions={'muting': True})
         await ctx.send('Muting threshold has been enabled.')
 
     @_mute_bw_settings.command(name="disable")
@@ -348,6 +1513,7 @@ class VSMod(commands.Cog):
 
         # Disable muting threshold
         await self.config.guild(ctx.guild).actions.muting.set(False)
+        self.update_settings(ctx.guild, actions={'muting': False})
         await ctx.send('Muting threshold has been disabled.')
 
     @_ban_bw_settings.command(name="enable")
@@ -359,6 +1525,7 @@ class VSMod(commands.Cog):
 
         # Enable banning threshold
         await self.config.guild(ctx.guild).actions.banning.set(True)
+        self.update_settings(ctx.guild, actions={'banning': True})
         await ctx.send('Banning threshold has been enabled.')
 
     @_ban_bw_settings.command(name="disable")
@@ -370,190 +1537,304 @@ class VSMod(commands.Cog):
 
         # Disable banning threshold
         await self.config.guild(ctx.guild).actions.banning.set(False)
+        self.update_settings(ctx.guild, actions={'banning': False})
         await ctx.send('Banning threshold has been disabled.')
 
-    async def contains_invite_link(self, input_string):
-        # Regular expressions for Discord invite links excluding event links
-        invite_patterns = [
-            r'discord\.gg/([a-zA-Z0-9\-]+)(?![\?])(?!(.*event=.*))',  # Matches regular invite links, excluding any with '?event='
-            r'discord\.com/invite/([a-zA-Z0-9\-]+)(?![\?])(?!(.*event=.*))'  # Matches the longer discord.com version, excluding any with '?event='
-        ]
+    async def handle_violation(self, message, settings, violation):
+        # Record a single warning for the offence and apply only the strongest action it has earned
+        guild = message.guild
+        author = message.author
+        actions = settings.actions
+        thresholds = settings.thresholds
+
+        with contextlib.suppress(discord.Forbidden, discord.NotFound):
+            await message.delete()
+
+        notice = f"Your message has been removed from {guild.name} for {violation.removal}."
+        reason = None
+        side_effects = []
+        # Filter actions go to the action log too, with the bot as moderator, so exports cover them
+        log_entries = []
+
+        def log_entry(action):
+            return {'timestamp': time.time(), 'moderator': self.bot.user.id, 'action': action, 'user': author.id, 'reason': violation.reason}
+
+        if actions['warning'] or actions['banning'] or actions['muting']:
+            warning_count = await self.add_warning(author, violation.reason)
+            reason = violation.reason
+            log_entries.append(log_entry('warn'))
+
+            if actions['banning'] and warning_count >= thresholds['banning_threshold']:
+                # DM before banning, the member can no longer be reached once they share no server with the bot
+                await self.notify_member(author, f'You have been banned from the server {guild.name} for {violation.repeated}.', reason)
+                try:
+                    await author.ban(reason=f'{violation.reason}.')
+                except discord.HTTPException as e:
+                    await self.debug_log(guild, "on_message", f"Failed to ban {author.id}: {e!r}")
+                    self.removal_notices.add(message.channel, author, violation.removal)
+                else:
+                    log_entries.append(log_entry('ban'))
+                await self.run_side_effects(guild, "on_message", self.mod_log.append_many(guild.id, log_entries))
+                return
 
-        return any(re.search(pattern, input_string) for pattern in invite_patterns)
+            if actions['muting'] and warning_count >= thresholds['muting_threshold']:
+                muted_role = await self.get_muted_role(guild)
+                if muted_role is None:
+                    await self.create_muted_role(guild)
+                    muted_role = await self.get_muted_role(guild)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):  # sourcery skip: low-code-quality
-        if message.guild is None or message.author.bot:
+                if muted_role is None:
+                    await self.debug_log(guild, "on_message", f"Error creating muted role for server {guild.name}")
+                else:
+                    mute_duration = thresholds['muting_time']
+                    try:
+                        await author.add_roles(muted_role)
+                    except discord.HTTPException as e:
+                        await self.debug_log(guild, "on_message", f"Failed to mute {author.id}: {e!r}")
+                    else:
+                        log_entries.append(log_entry('mute'))
+                        side_effects.append(self.schedule_unmute(author, mute_duration))
+                        notice = f'You have been muted in the server {guild.name} for {violation.description} for {mute_duration} minutes.\n{notice}'
+
+            elif actions['warning'] and warning_count >= thresholds['warning_threshold']:
+                side_effects.append(message.channel.send(f'{author.mention}, you have reached the warning threshold and may face further actions.'))
+                notice = f'You have received a warning in the server {guild.name} for {violation.description}.\n{notice}'
+
+        # Channel notices are batched in the background, deletions and bans above never wait behind them
+        self.removal_notices.add(message.channel, author, violation.removal)
+        side_effects.append(self.notify_member(author, notice, reason))
+        if log_entries:
+            side_effects.append(self.mod_log.append_many(guild.id, log_entries))
+        await self.run_side_effects(guild, "on_message", *side_effects)
+
+    async def notify_member(self, user, message, reason=None):
+        # Every action sends a single DM, members with closed DMs are not an error
+        if self.dm_failures.should_skip(user.id):
+            return False
+        if reason is not None:
+            message = f"{message}\nReason: {reason}"
+        try:
+            await user.send(message)
+        except discord.Forbidden:
+            # Closed DMs stay closed for a while, skip the round-trip for repeat offenders
+            self.dm_failures.add(user.id)
+            return False
+        except discord.HTTPException:
+            return False
+        return True
+
+    async def run_side_effects(self, guild, command, *side_effects):
+        # Independent steps run together, a failing step is logged without aborting the others
+        results = await asyncio.gather(*side_effects, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                await self.debug_log(guild, command, f"Side effect failed: {result!r}")
+        return results
+
+    @staticmethod
+    def failed_steps(results, steps):
+        # Names of the state-changing steps whose result came back as an exception
+        return [step for step, result in zip(steps, results) if isinstance(result, Exception)]
+
+    async def confirm_action(self, ctx, confirmation, failed):
+        # The moderator is only told everything worked once the writes have actually landed
+        if failed:
+            confirmation = f"{confirmation}\nHowever, {' and '.join(failed)} could not be saved, see the debug log."
+        await ctx.send(confirmation)
+
+    async def schedule_unmute(self, member, minutes):
+        expires_at = time.time() + minutes * 60
+        # set_raw and clear_raw touch a single key, so concurrent mutes never overwrite each other's entries
+        await self.config.guild(member.guild).set_raw('pending_unmutes', str(member.id), value=expires_at)
+        self.mute_scheduler.schedule(member.guild.id, member.id, expires_at)
+
+    async def cancel_unmute(self, member):
+        self.mute_scheduler.cancel(member.guild.id, member.id)
+        await self.config.guild(member.guild).clear_raw('pending_unmutes', str(member.id))
+
+    async def expire_mute(self, guild_id, member_id):
+        await self.bot.wait_until_red_ready()
+        await self.config.guild_from_id(guild_id).clear_raw('pending_unmutes', str(member_id))
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
             return
-        #Add debug print statement
-        if await self.config.guild(message.guild).enable_debug():
-            await self.debug_log(ctx.guild, "add", "Running 'on_message' listener")
+        member = guild.get_member(member_id)
+        muted_role = await self.get_muted_role(guild)
+        if member is None or muted_role is None or muted_role not in member.roles:
             return
-
-        content = message.content.lower()
-        content_words = content.split()
-
-        if content.startswith("!banned_words add") or content.startswith("!banned_words remove"):
+        try:
+            await member.remove_roles(muted_role, reason="Mute expired")
+        except (discord.Forbidden, discord.NotFound) as e:
+            await self.debug_log(guild, "unmute", f"Failed to remove muted role from {member_id}: {e}")
             return
+        with contextlib.suppress(discord.Forbidden):
+            await member.send(f'You have been unmuted in the server {guild.name}.')
+
+    def is_spamming(self, message, settings):
+        # Moderators chatting quickly should not trip the rate filter
+        if message.author.guild_permissions.manage_messages:
+            return False
+        detector = self._spam_detectors.get(message.guild.id)
+        if detector is None:
+            spam_filter = settings.spam_filter
+            detector = SpamDetector(spam_filter['max_messages'], spam_filter['per_seconds'])
+            self._spam_detectors[message.guild.id] = detector
+        return detector.check(message.author.id, time.monotonic())
+
+    def is_duplicate_flood(self, message, settings, normalized):
+        # Short messages like "lol" are repeated innocently all the time
+        if message.author.guild_permissions.manage_messages or len(normalized.text) < DUPLICATE_MIN_LENGTH:
+            return False
+        detector = self._duplicate_detectors.get(message.guild.id)
+        if detector is None:
+            duplicate_filter = settings.duplicate_filter
+            detector = DuplicateDetector(duplicate_filter['threshold'], duplicate_filter['window'])
+            self._duplicate_detectors[message.guild.id] = detector
+        fingerprint = hash(" ".join(normalized.tokens))
+        return detector.check(fingerprint, message.author.id, time.monotonic())
+
+    def get_join_monitor(self, guild, settings):
+        monitor = self._join_monitors.get(guild.id)
+        if monitor is None:
+            raid_mode = settings.raid_mode
+            monitor = JoinRateMonitor(raid_mode['joins'], raid_mode['per_seconds'], raid_mode['cooldown'])
+            self._join_monitors[guild.id] = monitor
+        return monitor
 
-        banned_words = await self.config.guild(message.guild).banned_words()
-
-        if any(word in content_words for word in banned_words):
-            actions = await self.config.guild(message.guild).actions()
-            thresholds = await self.config.guild(message.guild).thresholds()
-
-            if actions['warning']:
-                warnings = await self.config.guild(message.guild).warnings()
-                user_warnings = warnings.get(str(message.author.id), [])
-                user_warnings.append("Used banned words")
-                warnings[str(message.author.id)] = user_warnings
-                await self.config.guild(message.guild).warnings.set(warnings)
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        guild = member.guild
+        if member.bot:
+            return
+        settings = await self.get_settings(guild)
+        monitor = self._join_monitors.get(guild.id)
+        if settings.enable_debug or not (settings.raid_mode['enabled'] or (monitor is not None and monitor.active)):
+            return
 
-                warning_threshold = thresholds['warning_threshold']
+        monitor = self.get_join_monitor(guild, settings)
+        account_age_hours = (discord.utils.utcnow() - member.created_at).total_seconds() / 3600
+        if monitor.record(member.id, account_age_hours, time.monotonic()):
+            await self.start_raid(guild, "join rate exceeded")
+        elif monitor.active:
+            monitor.queue.append(member.id)
+            await self.raid_mute(member, settings)
+
+    async def start_raid(self, guild, reason):
+        settings = await self.get_settings(guild)
+        monitor = self.get_join_monitor(guild, settings)
+        now = time.monotonic()
+        monitor.start(now)
+        self._raid_profiles[guild.id] = settings.raid_profile()
+        # Filters rebuild their detectors from the stricter profile on the next message
+        self._spam_detectors.pop(guild.id, None)
+        self._duplicate_detectors.pop(guild.id, None)
+        task = self._raid_tasks.get(guild.id)
+        if task is None or task.done():
+            self._raid_tasks[guild.id] = asyncio.ensure_future(self.watch_raid(guild, monitor))
+
+        # Everyone in the window that tripped the alarm is treated as part of the raid
+        members = [guild.get_member(member_id) for member_id in monitor.recent_member_ids()]
+        members = [member for member in members if member is not None]
+        monitor.queue.extend(member.id for member in members)
+        await self.debug_log(guild, "raid", f"Raid mode started: {reason}, {monitor.rate(now)} joins in {monitor.per_seconds}s")
+        # Up to RAID_TRACKED_JOINS members can be in the window, mute them a few at a time
+        semaphore = asyncio.Semaphore(RAID_MUTE_CONCURRENCY)
+
+        async def mute(member):
+            async with semaphore:
+                await self.raid_mute(member, settings)
+
+        await self.run_side_effects(
+            guild, "raid",
+            self.send_raid_alert(guild, settings, self.format_raid_status(monitor, now, f"Raid mode enabled: {reason}.")),
+            *(mute(member) for member in members)
+        )
 
-                if len(user_warnings) >= warning_threshold:
-                    await message.channel.send(f'{message.author.mention}, you have reached the warning threshold and may face further actions.')
-                    # Send a DM to the user
-                    await message.author.send(f'You have received a warning in the server {message.guild.name} for using banned words.')
-                    await message.author.send('Reason: Used banned words')
+    async def end_raid(self, guild, reason):
+        monitor = self._join_monitors.get(guild.id)
+        if monitor is None or not monitor.active:
+            return
+        monitor.stop()
+        self._raid_profiles.pop(guild.id, None)
+        self._spam_detectors.pop(guild.id, None)
+        self._duplicate_detectors.pop(guild.id, None)
+        task = self._raid_tasks.pop(guild.id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        await self.debug_log(guild, "raid", f"Raid mode ended: {reason}")
+        await self.send_raid_alert(
+            guild, await self.get_settings(guild),
+            f"Raid mode disabled: {reason}. {len(monitor.queue)} raid joiners are queued, see `raid queue`."
+        )
 
-            if actions['banning']:
-                warnings = await self.config.guild(message.guild).warnings()
-                user_warnings = warnings.get(str(message.author.id), [])
-                user_warnings.append("Used banned words")
-                warnings[str(message.author.id)] = user_warnings
-                await self.config.guild(message.guild).warnings.set(warnings)
+    async def watch_raid(self, guild, monitor):
+        # Lifts raid mode on its own once the join rate has calmed down
+        while monitor.active:
+            await asyncio.sleep(max(1, min(monitor.per_seconds, monitor.cooldown)))
+            if monitor.should_end(time.monotonic()):
+                await self.end_raid(guild, "join rate back to normal")
 
-                banning_threshold = thresholds['banning_threshold']
+    async def raid_mute(self, member, settings):
+        muted_role = await self.get_muted_role(member.guild)
+        if muted_role is None:
+            await self.debug_log(member.guild, "raid", f"No muted role to mute raid joiner {member.id}")
+            return
+        try:
+            await member.add_roles(muted_role, reason="Raid mode")
+        except discord.HTTPException as e:
+            await self.debug_log(member.guild, "raid", f"Failed to mute raid joiner {member.id}: {e!r}")
+            return
+        await self.schedule_unmute(member, settings.default_mute_duration)
 
-                if len(user_warnings) >= banning_threshold:
-                    await message.author.ban(reason='Used banned words.')
-                    # Send a DM to the user
-                    await message.author.send(f'You have been banned from the server {message.guild.name} for repeatedly using banned words.')
-                    await message.author.send('Reason: Used banned words')
+    async def send_raid_alert(self, guild, settings, message):
+        channel = guild.get_channel(settings.raid_mode['alert_channel_id'] or 0)
+        if channel is not None:
+            await channel.send(message)
 
-            if actions['muting']:
-                # Check if muted role exists, create one if not
-                muted_role = await self.get_muted_role(message.guild)
-                if muted_role is None:
-                    await self.create_muted_role(message.guild)
-                    muted_role = await self.get_muted_role(message.guild)
+    @staticmethod
+    def format_raid_status(monitor, now, header):
+        lines = [header, f"Joins in the last {monitor.per_seconds}s: {monitor.rate(now)} (threshold {monitor.joins})"]
+        lines.extend(f"Account age {label}: {count}" for label, count in monitor.histogram(now))
+        return "\n".join(lines)
 
-                # If after creating it's still None, something went wrong, log it
-                if muted_role is None:
-                    await self.debug_log(message.guild, "on_message", f"Error creating muted role for server {message.guild.name}")
-                    return
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.guild is None or message.author.bot:
+            return
+        settings = await self.get_settings(message.guild)
+        settings = self._raid_profiles.get(message.guild.id, settings)
+        #Add debug print statement
+        if settings.enable_debug:
+            await self.debug_log(message.guild, "add", "Running 'on_message' listener")
+            return
 
-                warnings = await self.config.guild(message.guild).warnings()
-                user_warnings = warnings.get(str(message.author.id), [])
-                user_warnings.append("Used banned words")
-                warnings[str(message.author.id)] = user_warnings
-                await self.config.guild(message.guild).warnings.set(warnings)
+        content = message.content.lower()
 
-                muting_threshold = thresholds['muting_threshold']
+        if content.startswith("!banned_words add") or content.startswith("!banned_words remove"):
+            return
 
-                if len(user_warnings) >= muting_threshold:
-                    # Calculate the mute duration (in minutes)
-                    mute_duration = thresholds['muting_time']
+        if settings.spam_filter['enabled'] and self.is_spamming(message, settings):
+            await self.handle_violation(message, settings, SPAM_VIOLATION)
+            return
 
-                    # Send a DM to the user with the mute duration
-                    await message.author.send(f'You have been muted in the server {message.guild.name} for using banned words for {mute_duration} minutes.')
-                    await message.author.send('Reason: Used banned words')
+        normalized = normalize_content(message.content)
 
-                    await message.author.add_roles(muted_role)
+        if settings.duplicate_filter['enabled'] and self.is_duplicate_flood(message, settings, normalized):
+            await self.handle_violation(message, settings, DUPLICATE_VIOLATION)
+            return
 
-                # Delete the message and notify the user
-                await message.delete()
-                await message.author.send(f"Your message has been removed from {message.guild.name} for containing a banned word.")
-                await message.channel.send(f'{message.author.mention}, your message has been removed for containing a banned word.')
+        if settings.banned_words.matches(normalized.tokens):
+            await self.handle_violation(message, settings, BANNED_WORDS_VIOLATION)
+            return
 
         # Invite Link Filter
-        if await self.config.guild(message.guild).actions.invite_link_filter() and await self.contains_invite_link(message.content):
-
-            # Check if the user is an admin or has an exempt role
-            exempt_roles = await self.config.guild(message.guild).exempt_roles()
+        if settings.actions['invite_link_filter'] and contains_invite_link(normalized.text):
+            # Allow admins or users with exempt roles to post invite links
+            exempt_roles = settings.exempt_roles
             if message.author.guild_permissions.administrator or any(role.id in exempt_roles for role in message.author.roles):
-                # Allow admins or users with exempt roles to post invite links
                 return
 
-            print("Detected invite link in message:", message.content)  # Debug print
-            actions = await self.config.guild(message.guild).actions()
-            thresholds = await self.config.guild(message.guild).thresholds()
-
-            if actions['warning']:
-                warnings = await self.config.guild(message.guild).warnings()
-                user_warnings = warnings.get(str(message.author.id), [])
-                user_warnings.append("Sent an invite link")
-                warnings[str(message.author.id)] = user_warnings
-                await self.config.guild(message.guild).warnings.set(warnings)
-
-                warning_threshold = thresholds['warning_threshold']
-
-                if len(user_warnings) >= warning_threshold:
-                    await message.channel.send(f'{message.author.mention}, you have reached the warning threshold and may face further actions.')
-                    await message.author.send(f'You have received a warning in the server {message.guild.name} for sending an invite link.')
-                    await message.author.send('Reason: Sent an invite link')
-
-            if actions['banning']:
-                warnings = await self.config.guild(message.guild).warnings()
-                user_warnings = warnings.get(str(message.author.id), [])
-                user_warnings.append("Sent an invite link")
-                warnings[str(message.author.id)] = user_warnings
-                await self.config.guild(message.guild).warnings.set(warnings)
-
-                banning_threshold = thresholds['banning_threshold']
-
-                if len(user_warnings) >= banning_threshold:
-                    await message.author.ban(reason='Sent an invite link.')
-                    await message.author.send(f'You have been banned from the server {message.guild.name} for repeatedly sending invite links.')
-                    await message.author.send('Reason: Sent an invite link.')
-
-            if actions['muting']:
-                muted_role = await self.get_muted_role(message.guild)
-                if muted_role is None:
-                    await self.create_muted_role(message.guild)
-                    muted_role = await self.get_muted_role(message.guild)
-
-                if muted_role is None:
-                    await self.debug_log(message.guild, "on_message", f"Error creating muted role for server {message.guild.name}")
-                    return
-
-                warnings = await self.config.guild(message.guild).warnings()
-                user_warnings = warnings.get(str(message.author.id), [])
-                user_warnings.append("Sent an invite link")
-                warnings[str(message.author.id)] = user_warnings
-                await self.config.guild(message.guild).warnings.set(warnings)
-
-                muting_threshold = thresholds['muting_threshold']
-
-                if len(user_warnings) >= muting_threshold:
-                    await message.author.send(f'You have been muted in the server {message.guild.name} for sending an invite link.')
-                    await message.author.send('Reason: Sent an invite link.')
-                    await message.author.add_roles(muted_role)
-
-                    muting_time = thresholds['muting_time']
-
-                    await asyncio.sleep(muting_time * 60)  # Sleep for muting time in seconds
-                    await message.author.remove_roles(muted_role)
-                    await message.author.send(f'You have been unmuted in the server {message.guild.name}.')
-
-                try:
-                    await message.delete()
-                    print(f"Deleted message from {message.author} containing an invite link")  # Debug print
-                except discord.Forbidden:
-                    print("Bot doesn't have permission to delete messages.")  # Debug print
-
-                try:
-                    await message.author.send(f"Your message has been removed from {message.guild.name} for sending an invite link.")
-                    print("Sent DM to the user")  # Debug print
-                except discord.Forbidden:
-                    print("Bot can't send DMs to the user.")  # Debug print
-
-                try:
-                    await message.channel.send(f'{message.author.mention}, your message has been removed for sending an invite link.')
-                    print("Sent message to the channel")  # Debug print
-                except discord.Forbidden:
-                    print("Bot can't send messages to the channel.")
+            await self.handle_violation(message, settings, INVITE_LINK_VIOLATION)
 
     @commands.hybrid_command(name="warn")
     @commands.guild_only()
@@ -562,27 +1843,17 @@ class VSMod(commands.Cog):
         if await self.config.guild(ctx.guild).enable_debug():
             await self.debug_log(ctx.guild, "add", "Running  'warn' command with user {user.name}#{user.discriminator} ({user.id}) and reason: {reason}")
             return
-        warnings = await self.config.guild(ctx.guild).warnings()
-        user_warnings = warnings.get(str(user.id), [])
-        user_warnings.append(reason)
-        warnings[str(user.id)] = user_warnings
-        await self.config.guild(ctx.guild).warnings.set(warnings)
-
-        # Send a DM to the user
-        await user.send(f'You have received a warning in the server {ctx.guild.name}.')
-        await user.send(f'Reason: {reason}')
-
-        # Log the action
-        mod_actions = await self.config.guild(ctx.guild).mod_actions()
-        mod_actions.append({
-            'moderator': ctx.author.id,
-            'action': 'warn',
-            'user': user.id,
-            'reason': reason
-        })
-        await self.config.guild(ctx.guild).mod_actions.set(mod_actions)
-
-        await ctx.send(f'{user.mention} has been warned for: {reason}')
+        results = await self.run_side_effects(
+            ctx.guild, "warn",
+            self.add_warning(user, reason),
+            self.mod_log.append(ctx.guild.id, ctx.author.id, 'warn', user.id, reason),
+            self.notify_member(user, f'You have received a warning in the server {ctx.guild.name}.', reason)
+        )
+        failed = self.failed_steps(results, ("the warning", "the mod log entry"))
+        if failed:
+            await ctx.send(f"Could not save {' or '.join(failed)} for {user.mention}, see the debug log.")
+        else:
+            await ctx.send(f'{user.mention} has been warned for: {reason}')
 
     @commands.hybrid_command(name="kick")
     @commands.guild_only()
@@ -591,23 +1862,12 @@ class VSMod(commands.Cog):
         if await self.config.guild(ctx.guild).enable_debug():
             await self.debug_log(ctx.guild, "add", "Running  'kick' command with user {user.name}#{user.discriminator} ({user.id}) and reason: {reason}")
             return
+        # The DM has to go out while the member still shares the server with the bot
+        await self.notify_member(user, f'You have been Kicked from the server {ctx.guild.name}.', reason)
         await user.kick(reason=reason)
 
-        # Send a DM to the user
-        await user.send(f'You have been Kicked from the server {ctx.guild.name}.')
-        await user.send(f'Reason: {reason}')
-
-        # Log the action
-        mod_actions = await self.config.guild(ctx.guild).mod_actions()
-        mod_actions.append({
-            'moderator': ctx.author.id,
-            'action': 'kick',
-            'user': user.id,
-            'reason': reason
-        })
-        await self.config.guild(ctx.guild).mod_actions.set(mod_actions)
-
-        await ctx.send(f'{user.mention} has been kicked for: {reason}')
+        results = await self.run_side_effects(ctx.guild, "kick", self.mod_log.append(ctx.guild.id, ctx.author.id, 'kick', user.id, reason))
+        await self.confirm_action(ctx, f'{user.mention} has been kicked for: {reason}', self.failed_steps(results, ("the mod log entry",)))
 
     @commands.hybrid_command(name="mute")
     @commands.guild_only()
@@ -628,36 +1888,25 @@ class VSMod(commands.Cog):
             await ctx.send("Error creating muted role. Please check the bot's permissions and try again.")
             return
 
-        if time is not None:
-            # Set muting actions, thresholds, and time
-            await self.config.guild(ctx.guild).actions.muting.set(True)
-            await self.config.guild(ctx.guild).thresholds.muting_threshold.set(1)  # Change as needed
-            await self.config.guild(ctx.guild).thresholds.muting_time.set(time)
-
         await user.add_roles(muted_role)
 
-        # Send a DM to the user
         if time is not None:
-            await user.send(f'You have been muted in the server {ctx.guild.name} for {time} minutes.')
-        else:
-            await user.send(f'You have been muted indefinitely in the server {ctx.guild.name}.')
-        await user.send(f'Reason: {reason}')
-
-        # Log the action
-        mod_actions = await self.config.guild(ctx.guild).mod_actions()
-        mod_actions.append({
-            'moderator': ctx.author.id,
-            'action': 'mute',
-            'user': user.id,
-            'reason': reason
-        })
-        await self.config.guild(ctx.guild).mod_actions.set(mod_actions)
-
-        # Mention the user and notify the channel
-        if time is not None:
-            await ctx.send(f'{user.mention} has been muted for {time} minutes for: {reason}')
+            results = await self.run_side_effects(
+                ctx.guild, "mute",
+                self.schedule_unmute(user, time),
+                self.mod_log.append(ctx.guild.id, ctx.author.id, 'mute', user.id, reason),
+                self.notify_member(user, f'You have been muted in the server {ctx.guild.name} for {time} minutes.', reason)
+            )
+            confirmation = f'{user.mention} has been muted for {time} minutes for: {reason}'
         else:
-            await ctx.send(f'{user.mention} has been muted indefinitely for: {reason}')
+            results = await self.run_side_effects(
+                ctx.guild, "mute",
+                self.cancel_unmute(user),
+                self.mod_log.append(ctx.guild.id, ctx.author.id, 'mute', user.id, reason),
+                self.notify_member(user, f'You have been muted indefinitely in the server {ctx.guild.name}.', reason)
+            )
+            confirmation = f'{user.mention} has been muted indefinitely for: {reason}'
+        await self.confirm_action(ctx, confirmation, self.failed_steps(results, ("the mute expiry", "the mod log entry")))
 
     @commands.hybrid_command(name="ban")
     @commands.guild_only()
@@ -666,23 +1915,286 @@ class VSMod(commands.Cog):
         if await self.config.guild(ctx.guild).enable_debug():
             await self.debug_log(ctx.guild, "add", "Running  'ban' command with user {user.name}#{user.discriminator} ({user.id}) and reason: {reason}")
             return
+        # The DM has to go out while the member still shares the server with the bot
+        await self.notify_member(user, f'You have been banned from the server {ctx.guild.name}.', reason)
         await user.ban(reason=reason)
 
-        # Send a DM to the user
-        await user.send(f'You have been banned from the server {ctx.guild.name}.')
-        await user.send(f'Reason: {reason}')
+        results = await self.run_side_effects(ctx.guild, "ban", self.mod_log.append(ctx.guild.id, ctx.author.id, 'ban', user.id, reason))
+        await self.confirm_action(ctx, f'{user.mention} has been banned for: {reason}', self.failed_steps(results, ("the mod log entry",)))
+
+    @staticmethod
+    def can_moderate(moderator, member):
+        return moderator == moderator.guild.owner or member.top_role < moderator.top_role
+
+    async def run_mass_action(self, ctx, action, options):
+        guild = ctx.guild
+        try:
+            options = parse_mass_action_options(options)
+        except (ValueError, IndexError):
+            await ctx.send(
+                "Invalid options. Use user mentions or IDs, `--joined <minutes>`, `--raid`"
+                + (", `-t <minutes>`" if action == 'mute' else "") + " and `-r <reason>`."
+            )
+            return
+        if options.duration is not None and action != 'mute':
+            await ctx.send("Only mass_mute takes a duration.")
+            return
+        reason = options.reason or f"Mass {action}"
+
+        # Dict keys keep the order users were given in while dropping duplicates
+        user_ids = dict.fromkeys(options.user_ids)
+        if options.joined_minutes is not None:
+            cutoff = discord.utils.utcnow() - datetime.timedelta(minutes=options.joined_minutes)
+            user_ids.update(dict.fromkeys(
+                member.id for member in guild.members
+                if not member.bot and member.joined_at is not None and member.joined_at >= cutoff
+            ))
+        monitor = self._join_monitors.get(guild.id)
+        if options.raid_queue and monitor is not None:
+            user_ids.update(dict.fromkeys(monitor.queue))
+
+        protected = {ctx.author.id, self.bot.user.id, guild.owner_id}
+        targets = []
+        skipped = 0
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            # Only bans can reach users who are no longer in the server
+            if user_id in protected or (member is None and action != 'ban') or (member is not None and not self.can_moderate(ctx.author, member)):
+                skipped += 1
+            else:
+                targets.append((user_id, member))
+
+        if not targets:
+            await ctx.send(f"No users to {action}, {skipped} skipped.")
+            return
+        if len(targets) > MASS_ACTION_MAX_TARGETS:
+            await ctx.send(f"Too many users ({len(targets)}), the limit is {MASS_ACTION_MAX_TARGETS} per command.")
+            return
+
+        muted_role = None
+        if action == 'mute':
+            muted_role = await self.get_muted_role(guild)
+            if muted_role is None:
+                await self.create_muted_role(guild)
+                muted_role = await self.get_muted_role(guild)
+            if muted_role is None:
+                await ctx.send("Error creating muted role. Please check the bot's permissions and try again.")
+                return
+
+        async def perform(user_id, member):
+            if action == 'ban':
+                # The DM has to go out while the member still shares the server with the bot
+                if member is not None:
+                    await self.notify_member(member, f'You have been banned from the server {guild.name}.', reason)
+                await guild.ban(discord.Object(id=user_id), reason=reason)
+            elif action == 'kick':
+                await self.notify_member(member, f'You have been Kicked from the server {guild.name}.', reason)
+                await member.kick(reason=reason)
+            else:
+                await member.add_roles(muted_role, reason=reason)
+                if options.duration is not None:
+                    await self.run_side_effects(
+                        guild, "mass_mute",
+                        self.schedule_unmute(member, options.duration),
+                        self.notify_member(member, f'You have been muted in the server {guild.name} for {options.duration} minutes.', reason)
+                    )
+                else:
+                    await self.run_side_effects(
+                        guild, "mass_mute",
+                        self.cancel_unmute(member),
+                        self.notify_member(member, f'You have been muted indefinitely in the server {guild.name}.', reason)
+                    )
+
+        total = len(targets)
+        done = 0
+        failed = 0
+        entries = []
+        # discord.py waits out 429s per route, the semaphore keeps the burst it has to absorb small
+        semaphore = asyncio.Semaphore(MASS_ACTION_CONCURRENCY)
+
+        async def apply(user_id, member):
+            nonlocal done, failed
+            async with semaphore:
+                try:
+                    await perform(user_id, member)
+                except discord.HTTPException as e:
+                    failed += 1
+                    await self.debug_log(guild, f"mass_{action}", f"Failed to {action} {user_id}: {e}")
+                else:
+                    entries.append({'timestamp': time.time(), 'moderator': ctx.author.id, 'action': action, 'user': user_id, 'reason': reason})
+                done += 1
+
+        in_progress, finished = MASS_ACTION_LABELS[action]
+        progress = await ctx.send(f"{in_progress} {total} users...")
 
-        # Log the action
-        mod_actions = await self.config.guild(ctx.guild).mod_actions()
-        mod_actions.append({
-            'moderator': ctx.author.id,
-            'action': 'ban',
-            'user': user.id,
-            'reason': reason
-        })
-        await self.config.guild(ctx.guild).mod_actions.set(mod_actions)
+        async def report():
+            # Message edits are rate limited too, so progress is refreshed on an interval rather than per user
+            while True:
+                await asyncio.sleep(MASS_ACTION_PROGRESS_INTERVAL)
+                with contextlib.suppress(discord.HTTPException):
+                    await progress.edit(content=f"{in_progress} users: {done}/{total} done, {failed} failed...")
 
-        await ctx.send(f'{user.mention} has been banned for: {reason}')
+        reporter = asyncio.ensure_future(report())
+        try:
+            await asyncio.gather(*(apply(user_id, member) for user_id, member in targets))
+        finally:
+            reporter.cancel()
+
+        # One transaction for the whole batch instead of a log write per user
+        if entries:
+            await self.mod_log.append_many(guild.id, entries)
+        if options.raid_queue and monitor is not None:
+            handled = {entry['user'] for entry in entries}
+            monitor.queue = deque((user_id for user_id in monitor.queue if user_id not in handled), maxlen=RAID_QUEUE_SIZE)
+        summary = f"{finished} {len(entries)}/{total} users for: {reason}. {failed} failed, {skipped} skipped."
+        try:
+            await progress.edit(content=summary)
+        except discord.HTTPException:
+            await ctx.send(summary)
+
+    @commands.hybrid_command(name="mass_ban")
+    @commands.guild_only()
+    @checks.mod_or_permissions(ban_members=True)
+    async def mass_ban(self, ctx, *, options: str):
+        """Ban many users at once.
+
+        Options: user mentions or IDs, `--joined <minutes>`, `--raid` for the raid queue, `-r <reason>`.
+        """
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", f"Running 'mass_ban' command with options: {options}")
+            return
+        await self.run_mass_action(ctx, 'ban', options)
+
+    @commands.hybrid_command(name="mass_kick")
+    @commands.guild_only()
+    @checks.mod_or_permissions(ban_members=True)
+    async def mass_kick(self, ctx, *, options: str):
+        """Kick many members at once.
+
+        Options: user mentions or IDs, `--joined <minutes>`, `--raid` for the raid queue, `-r <reason>`.
+        """
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", f"Running 'mass_kick' command with options: {options}")
+            return
+        await self.run_mass_action(ctx, 'kick', options)
+
+    @commands.hybrid_command(name="mass_mute")
+    @commands.guild_only()
+    @checks.mod_or_permissions(manage_roles=True)
+    async def mass_mute(self, ctx, *, options: str):
+        """Mute many members at once.
+
+        Options: user mentions or IDs, `--joined <minutes>`, `--raid` for the raid queue, `-t <minutes>`, `-r <reason>`.
+        """
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", f"Running 'mass_mute' command with options: {options}")
+            return
+        await self.run_mass_action(ctx, 'mute', options)
+
+    @commands.hybrid_command(name="modlog")
+    @commands.guild_only()
+    @checks.mod_or_permissions(ban_members=True)
+    async def modlog(self, ctx, *, options: str = None):
+        """Page through logged moderation actions.
+
+        Options: a user mention or ID, `-m <moderator>`, `-a <action>`, `-p <page>`.
+        """
+        user_id = None
+        moderator_id = None
+        action = None
+        page = 1
+
+        if options:
+            args = options.split()
+            skip = False
+            try:
+                for i, arg in enumerate(args):
+                    if skip:
+                        skip = False
+                        continue
+                    if arg in ['-m', '--moderator']:
+                        moderator_id = parse_user_id(args[i + 1])
+                        # An unparsable filter must not silently widen the query to the whole guild
+                        if moderator_id is None:
+                            raise ValueError(args[i + 1])
+                        skip = True
+                    elif arg in ['-a', '--action']:
+                        action = args[i + 1].lower()
+                        skip = True
+                    elif arg in ['-p', '--page']:
+                        page = max(1, int(args[i + 1]))
+                        skip = True
+                    else:
+                        user_id = parse_user_id(arg)
+                        if user_id is None:
+                            raise ValueError(arg)
+            except (ValueError, IndexError):
+                await ctx.send("Invalid options. Use a user mention or ID, `-m <moderator mention or ID>`, `-a <action>` or `-p <page>`.")
+                return
+
+        # One extra row tells whether there is a next page without counting the whole history
+        rows = await self.mod_log.query(
+            ctx.guild.id, user_id, moderator_id, action,
+            limit=MOD_LOG_PAGE_SIZE + 1, offset=(page - 1) * MOD_LOG_PAGE_SIZE
+        )
+        if not rows:
+            await ctx.send("No moderation actions found.")
+            return
+
+        embed = discord.Embed(title="Moderation Log", color=discord.Color.orange())
+        for case_number, timestamp, moderator, logged_action, user, reason in rows[:MOD_LOG_PAGE_SIZE]:
+            when = f"<t:{int(timestamp)}:f>" if timestamp else "unknown time"
+            embed.add_field(
+                name=f"Case #{case_number} \u2022 {logged_action}",
+                value=f"User: <@{user}>\nModerator: <@{moderator}>\nWhen: {when}\nReason: {reason or 'None'}"[:1024],
+                inline=False
+            )
+        more = f" \u2022 use `-p {page + 1}` for more" if len(rows) > MOD_LOG_PAGE_SIZE else ""
+        embed.set_footer(text=f"Page {page}{more}")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="export_modlog")
+    @commands.guild_only()
+    @checks.admin_or_permissions(manage_guild=True)
+    async def export_modlog(self, ctx, fmt: str = "jsonl"):
+        """Export moderation actions and the current members' warnings as a gzipped JSONL or CSV file.
+
+        Warning records of members who have left are not included, but every warning given by
+        the warn command or the message filters since they started logging is in the action log.
+        """
+        fmt = fmt.lower()
+        if fmt not in ('jsonl', 'csv'):
+            await ctx.send("Please choose either `jsonl` or `csv`.")
+            return
+
+        directory = str(redbot.core.data_manager.cog_data_path(cog_instance=self))
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=f".{fmt}.gz", delete=False) as export_file:
+            path = export_file.name
+        try:
+            async with ctx.typing():
+                count = await self.mod_log.export(ctx.guild.id, path, fmt)
+                # Warnings are read a chunk of members at a time rather than loading every member record at once
+                member_ids = [member.id for member in ctx.guild.members]
+                for start in range(0, len(member_ids), MOD_LOG_EXPORT_CHUNK):
+                    rows = []
+                    for user_id in member_ids[start:start + MOD_LOG_EXPORT_CHUNK]:
+                        for reason in await self.config.member_from_ids(ctx.guild.id, user_id).warnings():
+                            rows.append({
+                                'type': 'warning', 'case_number': None, 'timestamp': None,
+                                'moderator_id': None, 'action': 'warn', 'user_id': user_id, 'reason': reason
+                            })
+                    if rows:
+                        count += await self.mod_log.append_export_rows(path, fmt, rows)
+            if os.path.getsize(path) > ctx.guild.filesize_limit:
+                await ctx.send("The export is larger than this server's upload limit.")
+                return
+            await ctx.send(
+                f"Exported {count} moderation record(s).",
+                file=discord.File(path, filename=f"{ctx.guild.id}-modlog.{fmt}.gz")
+            )
+        finally:
+            with contextlib.suppress(OSError):
+                os.remove(path)
 
     @commands.hybrid_command(name="unmute")
     @commands.guild_only()
@@ -703,6 +2215,7 @@ class VSMod(commands.Cog):
             await ctx.send("Error creating muted role. Please check the bot's permissions and try again.")
             return
 
+        await self.cancel_unmute(user)
         if muted_role and muted_role in user.roles:
             await user.remove_roles(muted_role)
             await ctx.send(f'{user.mention} has been unmuted.')
@@ -726,10 +2239,7 @@ class VSMod(commands.Cog):
         if await self.config.guild(ctx.guild).enable_debug():
             await self.debug_log(ctx.guild, "add", "Running  'clear_warnings' command with user {user.name}#{user.discriminator} ({user.id})")
             return
-        warnings = await self.config.guild(ctx.guild).warnings()
-        if user_warnings := warnings.get(str(user.id), []):
-            warnings[str(user.id)] = []
-            await self.config.guild(ctx.guild).warnings.set(warnings)
+        if await self.clear_member_warnings(user):
             await ctx.send(f'Warnings for {user.mention} have been cleared.')
         else:
             await ctx.send(f'{user.mention} has no warnings.')
@@ -749,8 +2259,7 @@ class VSMod(commands.Cog):
         if user != ctx.author and not ctx.author.guild_permissions.ban_members:
             return await ctx.send("You can only view your own warnings.")
 
-        warnings = await self.config.guild(ctx.guild).warnings()
-        user_warnings = warnings.get(str(user.id), [])
+        user_warnings = await self.config.member(user).warnings()
         if user_warnings:
             warnings_embeds = []
             instructions = "React with ❌ to delete a warning (only available for moderators).\nReact with ✅ to close this message.\nReact with ✅ to close this message.\nUse ⬅️ ➡️ to navigate."
@@ -779,16 +2288,16 @@ class VSMod(commands.Cog):
             await message.add_reaction("❌")  # Cross emoji
             await message.add_reaction("✅")  # Checkmark emoji
 
-            def check(reaction, user):
+            def check(reaction, reactor):
                 return (
-                    user == ctx.author
+                    reactor == ctx.author
                     and reaction.message.id == message.id
                     and str(reaction.emoji) in {"❌", "✅", "⬅️", "➡️"}
                 )
 
             while True:
                 try:
-                    reaction, user = await self.bot.wait_for('reaction_add', timeout=60.0, check=check)
+                    reaction, reactor = await self.bot.wait_for('reaction_add', timeout=60.0, check=check)
                 except TimeoutError:
                     break
                 else:
@@ -803,8 +2312,7 @@ class VSMod(commands.Cog):
                     elif str(reaction.emoji) == "\u274c":
                         if ctx.author.guild_permissions.ban_members:
                             if 0 <= current_page - 1 < len(user_warnings):
-                                deleted_warning = user_warnings.pop(current_page - 1)
-                                warnings[str(user.id)] = user_warnings
+                                user_warnings = await self.remove_warning(user, current_page - 1)
 
                                 warnings_embeds = [instructions_embed]
                                 for idx, reason in enumerate(user_warnings, start=1):
@@ -816,8 +2324,6 @@ class VSMod(commands.Cog):
                                     embed.set_footer(text=f'Page {idx}/{len(user_warnings)}')
                                     warnings_embeds.append(embed)
 
-                                await self.config.guild(ctx.guild).warnings.set(warnings)
-
                                 if len(user_warnings) > 0:
                                     current_page = min(current_page, len(user_warnings))
                                     await message.edit(embed=warnings_embeds[current_page])
@@ -833,7 +2339,7 @@ class VSMod(commands.Cog):
                         # Close the embed
                         await message.delete()
                         break
-                    await message.remove_reaction(reaction, user)
+                    await message.remove_reaction(reaction, reactor)
         else:
             await ctx.send(f'{user.mention} has no warnings.')
 
@@ -899,8 +2405,31 @@ class VSMod(commands.Cog):
             return
 
         await self.config.guild(ctx.guild).default_mute_duration.set(duration)
+        self.update_settings(ctx.guild, default_mute_duration=duration)
         await ctx.send(f'Default mute duration set to {duration} minutes.')
 
+    @_mute_settings.command(name="sync_role")
+    async def sync_muted_role(self, ctx):
+        """Apply the muted role to every channel that is still missing it."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'sync_role' sub-command of '_mute_settings' command")
+            return
+
+        muted_role = await self.get_muted_role(ctx.guild)
+        if muted_role is None:
+            await ctx.send("Muted role not found. Please check the bot's permissions and try again.")
+            return
+
+        status_message = await ctx.send("Applying the muted role to channels...")
+
+        async def progress(done, total, failed):
+            if done % 25 == 0:
+                with contextlib.suppress(discord.HTTPException):
+                    await status_message.edit(content=f"Applying the muted role to channels... {done}/{total} ({failed} failed)")
+
+        applied, total = await self.start_muted_role_rollout(ctx.guild, muted_role, progress)
+        await status_message.edit(content=f"Muted role applied to {applied}/{total} channels that were missing it.")
+
     @_settings.group(name="suggestion")
     async def _suggestion_settings(self, ctx):
         # Add debug statement
@@ -919,10 +2448,60 @@ class VSMod(commands.Cog):
         else:
             await ctx.send('You must have administrator permissions to set the suggestion channel.')
 
+    async def stream_clean(self, channel, before, num_messages, stop_at_msg_id, check, counts):
+        # Walks history newest first without buffering it, so neither the count nor the -to range is capped
+        after = discord.Object(id=stop_at_msg_id) if stop_at_msg_id else None
+        batch = []
+
+        async def flush():
+            if len(batch) == 1:
+                with contextlib.suppress(discord.NotFound):
+                    await batch[0].delete()
+            else:
+                await channel.delete_messages(batch)
+            counts['deleted'] += len(batch)
+            batch.clear()
+
+        async for msg in channel.history(limit=None, before=before, after=after, oldest_first=False):
+            counts['scanned'] += 1
+            if not check(msg):
+                continue
+            bulk_cutoff = discord.utils.time_snowflake(discord.utils.utcnow() - CLEAN_BULK_DELETE_MAX_AGE)
+            if msg.id > bulk_cutoff:
+                batch.append(msg)
+                if len(batch) == CLEAN_BULK_DELETE_SIZE:
+                    await flush()
+            else:
+                # Bulk delete rejects messages older than 14 days, and everything after this one is older still
+                if batch:
+                    await flush()
+                with contextlib.suppress(discord.NotFound):
+                    await msg.delete()
+                counts['deleted'] += 1
+                await asyncio.sleep(CLEAN_SINGLE_DELETE_DELAY)
+            if num_messages is not None and counts['deleted'] + len(batch) >= num_messages:
+                break
+        if batch:
+            await flush()
+
     @commands.hybrid_command(name="clean", aliases=["clear", "purge"])
     @commands.guild_only()
     @commands.has_permissions(manage_messages=True)
     async def clean(self, ctx, *, options: str = None):
+        """Delete recent messages.
+
+        Options: a number of messages, `-to <message id>`, `-a` for attachments only, a member name or ID.
+        Use `clean cancel` to stop a clean running in this channel.
+        """
+        if options and options.strip().lower() == 'cancel':
+            task = self._clean_tasks.get(ctx.channel.id)
+            if task is None or task.done():
+                await ctx.send("No clean is running in this channel.", delete_after=5)
+                return
+            task.cancel()
+            await ctx.send("Stopping clean.", delete_after=5)
+            return
+
         # Set default options
         delete_attachments_only = False
         stop_at_msg_id = None
@@ -933,48 +2512,98 @@ class VSMod(commands.Cog):
         if options:
             # Split the options by space and process
             args = options.split()
+            skip = False
             for i, arg in enumerate(args):
+                if skip:
+                    skip = False
+                    continue
                 if arg in ['-a', '--attachments']:
                     delete_attachments_only = True
                 elif arg.startswith('-to') or arg.startswith('--to'):
                     try:
                         # Extract the message ID for the -to option
-                        stop_at_msg_id = int(arg.split('=')[1]) if '=' in arg else int(args[i + 1])
-                        # Hardcode the message limit to 100 if `-to` is used
-                        num_messages = 100
+                        if '=' in arg:
+                            stop_at_msg_id = int(arg.split('=')[1])
+                        else:
+                            stop_at_msg_id = int(args[i + 1])
+                            skip = True
                     except (ValueError, IndexError):
                         await ctx.send("Invalid message ID provided for `-to` option.", delete_after=5)
                         return
-                elif arg.isdigit() and not num_messages:
-                    # Set the number of messages if it's a valid number
+                elif arg.isdigit() and num_messages is None and int(arg) < CLEAN_MIN_SNOWFLAKE and not ctx.guild.get_member(int(arg)):
+                    # Set the number of messages if it's a valid number and not a member ID
                     num_messages = int(arg)
                 else:
                     # Attempt to match username or user ID
                     user = ctx.guild.get_member_named(arg)
+                    member_id = parse_user_id(arg)
                     if user:
                         user_id = user.id
-                    elif ctx.guild.get_member(int(arg)):
-                        user_id = int(arg)
+                    elif member_id is not None and ctx.guild.get_member(member_id):
+                        user_id = member_id
+                    else:
+                        # An unknown member must not fall back to deleting everyone's messages
+                        await ctx.send(f"No member found matching `{arg}`.", delete_after=5)
+                        return
 
-        # Ensure the number of messages to delete is within a reasonable range only if num_messages is explicitly set
-        if num_messages is not None and not (1 <= num_messages <= 100):
-            await ctx.send("Please provide a number between 1 and 100.", delete_after=5)
+        if num_messages is None and stop_at_msg_id is None:
+            await ctx.send("Please provide a number of messages or `-to <message id>`.", delete_after=5)
+            return
+        if num_messages is not None and not (1 <= num_messages <= CLEAN_MAX_MESSAGES):
+            await ctx.send(
+                f"Please provide a number between 1 and {CLEAN_MAX_MESSAGES}, or use `-to <message id>` for larger ranges.",
+                delete_after=5
+            )
+            return
+
+        task = self._clean_tasks.get(ctx.channel.id)
+        if task is not None and not task.done():
+            await ctx.send("A clean is already running in this channel, use `clean cancel` to stop it.", delete_after=5)
             return
 
         # Define the check function to filter messages
         def check(msg: Message):
-            # If stop_at_msg_id is set, stop purging when reaching it
-            if stop_at_msg_id and msg.id <= stop_at_msg_id:
-                return False
             # Check if only messages with attachments should be deleted
             if delete_attachments_only and not msg.attachments:
                 return False
             # Filter by user ID if set
             return not user_id or msg.author.id == user_id
 
-        # Purge messages based on the specified limit and check criteria
-        deleted_messages = await ctx.channel.purge(limit=num_messages + 1, check=check)
-        await ctx.send(f"Deleted {len(deleted_messages)} message(s).", delete_after=5)
+        if ctx.interaction is None:
+            with contextlib.suppress(discord.HTTPException):
+                await ctx.message.delete()
+
+        counts = {'scanned': 0, 'deleted': 0}
+        # The progress message is newer than the command, so the history walk never reaches it
+        progress = await ctx.send("Deleting messages...")
+        task = asyncio.ensure_future(self.stream_clean(ctx.channel, ctx.message, num_messages, stop_at_msg_id, check, counts))
+        self._clean_tasks[ctx.channel.id] = task
+
+        async def report():
+            while True:
+                await asyncio.sleep(CLEAN_PROGRESS_INTERVAL)
+                with contextlib.suppress(discord.HTTPException):
+                    await progress.edit(content=f"Deleting messages... {counts['deleted']} deleted, {counts['scanned']} scanned.")
+
+        reporter = asyncio.ensure_future(report())
+        try:
+            await asyncio.wait([task])
+        finally:
+            reporter.cancel()
+            if self._clean_tasks.get(ctx.channel.id) is task:
+                del self._clean_tasks[ctx.channel.id]
+
+        if task.cancelled():
+            summary = f"Clean cancelled after deleting {counts['deleted']} message(s)."
+        elif task.exception() is not None:
+            await self.debug_log(ctx.guild, "clean", f"Clean failed: {task.exception()!r}")
+            summary = f"Clean stopped after deleting {counts['deleted']} message(s): {task.exception()}"
+        else:
+            summary = f"Deleted {counts['deleted']} message(s)."
+        try:
+            await progress.edit(content=summary, delete_after=5)
+        except discord.HTTPException:
+            await ctx.send(summary, delete_after=5)
 
     @commands.guild_only()
     @commands.bot_has_permissions(manage_guild=True)
@@ -993,6 +2622,7 @@ class VSMod(commands.Cog):
             return
 
         await self.config.guild(ctx.guild).actions.invite_link_filter.set(True)
+        self.update_settings(ctx.guild, actions={'invite_link_filter': True})
         await ctx.send('Invite link filter has been enabled.')
 
     @_invite_filter.command(name="disable")
@@ -1002,6 +2632,7 @@ class VSMod(commands.Cog):
             return
 
         await self.config.guild(ctx.guild).actions.invite_link_filter.set(False)
+        self.update_settings(ctx.guild, actions={'invite_link_filter': False})
         await ctx.send('Invite link filter has been disabled.')
 
     @_invite_filter.command(name="exempt_role")
@@ -1015,6 +2646,7 @@ class VSMod(commands.Cog):
         if role.id not in exempt_roles:
             exempt_roles.append(role.id)
             await self.config.guild(ctx.guild).exempt_roles.set(exempt_roles)
+            self.update_settings(ctx.guild, exempt_roles=frozenset(exempt_roles))
             await ctx.send(f"Role {role.name} has been added to the invite filter exempt list.")
         else:
             await ctx.send(f"Role {role.name} is already in the exempt list.")
@@ -1030,6 +2662,7 @@ class VSMod(commands.Cog):
         if role.id in exempt_roles:
             exempt_roles.remove(role.id)
             await self.config.guild(ctx.guild).exempt_roles.set(exempt_roles)
+            self.update_settings(ctx.guild, exempt_roles=frozenset(exempt_roles))
             await ctx.send(f"Role {role.name} has been removed from the invite filter exempt list.")
         else:
             await ctx.send(f"Role {role.name} is not in the exempt list.")
@@ -1051,6 +2684,241 @@ class VSMod(commands.Cog):
         await ctx.send(f"Exempt Roles: {', '.join(role_names)}")
 
 
+    @commands.guild_only()
+    @commands.bot_has_permissions(manage_guild=True)
+    @commands.has_permissions(manage_guild=True)
+    @commands.group(name="spam_filter")
+    async def _spam_filter(self, ctx):
+        # Add debug statement
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'spam_filter' command")
+            return
+
+    @_spam_filter.command(name="enable")
+    async def enable_spam_filter(self, ctx):
+        """Warn, mute or ban members who send messages too quickly."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'enable' sub-command of 'spam_filter' command")
+            return
+
+        await self.config.guild(ctx.guild).spam_filter.enabled.set(True)
+        self.update_settings(ctx.guild, spam_filter={'enabled': True})
+        await ctx.send('Spam filter has been enabled.')
+
+    @_spam_filter.command(name="disable")
+    async def disable_spam_filter(self, ctx):
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'disable' sub-command of 'spam_filter' command")
+            return
+
+        await self.config.guild(ctx.guild).spam_filter.enabled.set(False)
+        self.update_settings(ctx.guild, spam_filter={'enabled': False})
+        self._spam_detectors.pop(ctx.guild.id, None)
+        await ctx.send('Spam filter has been disabled.')
+
+    @_spam_filter.command(name="set")
+    async def set_spam_filter(self, ctx, max_messages: int, per_seconds: int):
+        """Flag members who send `max_messages` messages within `per_seconds` seconds."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'set' sub-command of 'spam_filter' command")
+            return
+
+        if max_messages < 2 or per_seconds < 1:
+            await ctx.send("Please allow at least 2 messages over at least 1 second.")
+            return
+
+        await self.config.guild(ctx.guild).spam_filter.max_messages.set(max_messages)
+        await self.config.guild(ctx.guild).spam_filter.per_seconds.set(per_seconds)
+        self.update_settings(ctx.guild, spam_filter={'max_messages': max_messages, 'per_seconds': per_seconds})
+        # The next message rebuilds the detector with the new window size
+        self._spam_detectors.pop(ctx.guild.id, None)
+        await ctx.send(f'Spam filter set to {max_messages} messages per {per_seconds} seconds.')
+
+    @commands.guild_only()
+    @commands.bot_has_permissions(manage_guild=True)
+    @commands.has_permissions(manage_guild=True)
+    @commands.group(name="duplicate_filter")
+    async def _duplicate_filter(self, ctx):
+        # Add debug statement
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'duplicate_filter' command")
+            return
+
+    @_duplicate_filter.command(name="enable")
+    async def enable_duplicate_filter(self, ctx):
+        """Act on members posting the same message as many others."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'enable' sub-command of 'duplicate_filter' command")
+            return
+
+        await self.config.guild(ctx.guild).duplicate_filter.enabled.set(True)
+        self.update_settings(ctx.guild, duplicate_filter={'enabled': True})
+        await ctx.send('Duplicate message filter has been enabled.')
+
+    @_duplicate_filter.command(name="disable")
+    async def disable_duplicate_filter(self, ctx):
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'disable' sub-command of 'duplicate_filter' command")
+            return
+
+        await self.config.guild(ctx.guild).duplicate_filter.enabled.set(False)
+        self.update_settings(ctx.guild, duplicate_filter={'enabled': False})
+        self._duplicate_detectors.pop(ctx.guild.id, None)
+        await ctx.send('Duplicate message filter has been disabled.')
+
+    @_duplicate_filter.command(name="set")
+    async def set_duplicate_filter(self, ctx, threshold: int, seconds: int):
+        """Flag a message once `threshold` different members post it within `seconds` seconds."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'set' sub-command of 'duplicate_filter' command")
+            return
+
+        if threshold < 2 or seconds < DUPLICATE_BUCKET_SECONDS:
+            await ctx.send(f"Please use a threshold of at least 2 over at least {DUPLICATE_BUCKET_SECONDS} seconds.")
+            return
+
+        await self.config.guild(ctx.guild).duplicate_filter.threshold.set(threshold)
+        await self.config.guild(ctx.guild).duplicate_filter.window.set(seconds)
+        self.update_settings(ctx.guild, duplicate_filter={'threshold': threshold, 'window': seconds})
+        self._duplicate_detectors.pop(ctx.guild.id, None)
+        await ctx.send(f'Duplicate filter set to {threshold} members posting the same message within {seconds} seconds.')
+
+    @commands.guild_only()
+    @commands.bot_has_permissions(manage_guild=True)
+    @commands.has_permissions(manage_guild=True)
+    @commands.group(name="raid")
+    async def _raid(self, ctx):
+        # Add debug statement
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'raid' command")
+            return
+
+    @_raid.command(name="enable")
+    async def enable_raid_detection(self, ctx):
+        """Switch to raid mode automatically when members join too quickly."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'enable' sub-command of 'raid' command")
+            return
+
+        await self.config.guild(ctx.guild).raid_mode.enabled.set(True)
+        self.update_settings(ctx.guild, raid_mode={'enabled': True})
+        await ctx.send('Raid detection has been enabled.')
+
+    @_raid.command(name="disable")
+    async def disable_raid_detection(self, ctx):
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'disable' sub-command of 'raid' command")
+            return
+
+        await self.config.guild(ctx.guild).raid_mode.enabled.set(False)
+        self.update_settings(ctx.guild, raid_mode={'enabled': False})
+        await self.end_raid(ctx.guild, f"raid detection disabled by {ctx.author}")
+        self._join_monitors.pop(ctx.guild.id, None)
+        await ctx.send('Raid detection has been disabled.')
+
+    @_raid.command(name="set")
+    async def set_raid_detection(self, ctx, joins: int, per_seconds: int, cooldown: int = 300):
+        """Start raid mode at `joins` joins within `per_seconds` seconds, lift it after `cooldown` quiet seconds."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'set' sub-command of 'raid' command")
+            return
+
+        if not 2 <= joins <= RAID_TRACKED_JOINS or per_seconds < 1 or cooldown < 1:
+            await ctx.send(
+                f"Please use between 2 and {RAID_TRACKED_JOINS} joins over at least 1 second and a cooldown of at least 1 second."
+            )
+            return
+
+        await self.config.guild(ctx.guild).raid_mode.joins.set(joins)
+        await self.config.guild(ctx.guild).raid_mode.per_seconds.set(per_seconds)
+        await self.config.guild(ctx.guild).raid_mode.cooldown.set(cooldown)
+        self.update_settings(ctx.guild, raid_mode={'joins': joins, 'per_seconds': per_seconds, 'cooldown': cooldown})
+        # A running monitor keeps its state, only the limits change
+        monitor = self._join_monitors.get(ctx.guild.id)
+        if monitor is not None:
+            monitor.joins, monitor.per_seconds, monitor.cooldown = joins, per_seconds, cooldown
+        await ctx.send(f'Raid mode set to start at {joins} joins within {per_seconds} seconds and lift after {cooldown} quiet seconds.')
+
+    @_raid.command(name="channel")
+    async def set_raid_channel(self, ctx, channel: discord.TextChannel = None):
+        """Post raid alerts to a channel, or stop posting them."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'channel' sub-command of 'raid' command")
+            return
+
+        channel_id = channel.id if channel else None
+        await self.config.guild(ctx.guild).raid_mode.alert_channel_id.set(channel_id)
+        self.update_settings(ctx.guild, raid_mode={'alert_channel_id': channel_id})
+        if channel:
+            await ctx.send(f'Raid alerts will be posted in {channel.mention}.')
+        else:
+            await ctx.send('Raid alerts will no longer be posted.')
+
+    @_raid.command(name="start")
+    async def start_raid_mode(self, ctx):
+        """Put the server in raid mode now."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'start' sub-command of 'raid' command")
+            return
+
+        await self.start_raid(ctx.guild, f"started by {ctx.author}")
+        await ctx.send('Raid mode is now active.')
+
+    @_raid.command(name="end")
+    async def end_raid_mode(self, ctx):
+        """Lift raid mode now."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'end' sub-command of 'raid' command")
+            return
+
+        monitor = self._join_monitors.get(ctx.guild.id)
+        if monitor is None or not monitor.active:
+            await ctx.send('Raid mode is not active.')
+            return
+        await self.end_raid(ctx.guild, f"ended by {ctx.author}")
+        await ctx.send('Raid mode has been lifted.')
+
+    @_raid.command(name="status")
+    async def raid_status(self, ctx):
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'status' sub-command of 'raid' command")
+            return
+
+        monitor = self.get_join_monitor(ctx.guild, await self.get_settings(ctx.guild))
+        now = time.monotonic()
+        if monitor.active:
+            header = f"Raid mode has been active for {int(now - monitor.since)} seconds."
+        else:
+            header = "Raid mode is not active."
+        await ctx.send(self.format_raid_status(monitor, now, f"{header} {len(monitor.queue)} raid joiners are queued."))
+
+    @_raid.command(name="queue")
+    async def raid_queue(self, ctx):
+        """List the members queued as raid joiners."""
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'queue' sub-command of 'raid' command")
+            return
+
+        monitor = self._join_monitors.get(ctx.guild.id)
+        if monitor is None or not monitor.queue:
+            await ctx.send('No raid joiners are queued.')
+            return
+        # Plain IDs paste straight into mass moderation commands
+        member_ids = [str(member_id) for member_id in monitor.queue]
+        for start in range(0, len(member_ids), RAID_QUEUE_PAGE_SIZE):
+            await ctx.send("```\n" + " ".join(member_ids[start:start + RAID_QUEUE_PAGE_SIZE]) + "\n```")
+
+    @_raid.command(name="clear_queue")
+    async def clear_raid_queue(self, ctx):
+        if await self.config.guild(ctx.guild).enable_debug():
+            await self.debug_log(ctx.guild, "add", "Running 'clear_queue' sub-command of 'raid' command")
+            return
+
+        monitor = self._join_monitors.get(ctx.guild.id)
+        if monitor is not None:
+            monitor.queue.clear()
+        await ctx.send('Raid queue has been cleared.')
+
     @commands.guild_only()
     @commands.bot_has_permissions(manage_guild=True)
     @commands.has_permissions(manage_guild=True)
@@ -1065,69 +2933,186 @@ class VSMod(commands.Cog):
     @_enable_debug.command()
     async def true(self, ctx):
         await self.config.guild(ctx.guild).enable_debug.set(True)
+        self.update_settings(ctx.guild, enable_debug=True)
         await ctx.send("Debug mode enabled.")
 
     @_enable_debug.command()
     async def false(self, ctx):
         await self.config.guild(ctx.guild).enable_debug.set(False)
+        self.update_settings(ctx.guild, enable_debug=False)
         await ctx.send("Debug mode disabled.")
 
+    @_owner_settings.command(name="dm_cache")
+    async def dm_cache_stats(self, ctx):
+        """Show how often DMs to members with closed DMs were skipped."""
+        cache = self.dm_failures
+        await ctx.send(
+            f"Closed DM cache: {len(cache)}/{cache.maxsize} users, TTL {cache.ttl // 60} minutes.\n"
+            f"Skipped sends (hits): {cache.hits}\nAttempted sends (misses): {cache.misses}"
+        )
+
     @_owner_settings.command(name="read_debug_log")
-    async def read_debug_log(self, ctx):
-        current_directory = redbot.core.data_manager.cog_data_path(cog_instance=self)
-        debug_file_path = f"{current_directory}/{ctx.guild.id}-debug.log"
+    async def read_debug_log(self, ctx, *, options: str = None):
+        """Read the debug log newest first.
 
-        try:
-            with open(debug_file_path, 'r') as debug_file:
-                log_contents = debug_file.read()
-                await ctx.send(f"Debug Log Contents for {ctx.guild.name}:\n```{log_contents}```")
-        except FileNotFoundError:
+        Options: `-p <page>`, `-c <command>`, `--since <minutes>`, `--until <minutes>`, `-f` to attach a gzip file.
+        """
+        page = 1
+        command = None
+        since = None
+        until = None
+        as_file = False
+
+        if options:
+            args = options.split()
+            now = datetime.datetime.now()
+            try:
+                for i, arg in enumerate(args):
+                    if arg in ['-p', '--page']:
+                        page = max(1, int(args[i + 1]))
+                    elif arg in ['-c', '--command']:
+                        command = args[i + 1]
+                    elif arg == '--since':
+                        since = now - datetime.timedelta(minutes=int(args[i + 1]))
+                    elif arg == '--until':
+                        until = now - datetime.timedelta(minutes=int(args[i + 1]))
+                    elif arg in ['-f', '--file']:
+                        as_file = True
+            except (ValueError, IndexError):
+                await ctx.send("Invalid options. Use `-p <page>`, `-c <command>`, `--since <minutes>`, `--until <minutes>` or `-f`.")
+                return
+
+        paths = self.debug_writer.paths_for(ctx.guild.id)
+        if not any(os.path.exists(path) for path in paths):
             await ctx.send("debug.log file not found.")
+            return
+
+        loop = asyncio.get_event_loop()
+        dropped = f" ({self.debug_writer.dropped} lines dropped since load)" if self.debug_writer.dropped else ""
+
+        if as_file:
+            buffer, line_count = await loop.run_in_executor(None, export_debug_log, paths, command, since, until)
+            await ctx.send(
+                f"Debug log for {ctx.guild.name}: {line_count} line(s){dropped}.",
+                file=discord.File(buffer, filename=f"{ctx.guild.id}-debug.log.gz")
+            )
+            return
+
+        lines, has_more = await loop.run_in_executor(None, read_debug_log_page, paths, page, command, since, until)
+        if not lines:
+            await ctx.send("No matching debug log entries on that page.")
+            return
+        footer = f"Use `-p {page + 1}` for older entries." if has_more else "End of log."
+        log_contents = "\n".join(lines)
+        await ctx.send(f"Debug Log Contents for {ctx.guild.name} (page {page}){dropped}:\n```{log_contents}```{footer}")
 
     async def check_status(self):
         try:
+            await self.bot.wait_until_red_ready()
             while True:
                 try:
-                    response = requests.get("https://discordstatus.com/api/v2/status.json")
-                    response.raise_for_status()
-                    data = response.json()
-                except requests.exceptions.RequestException as e:
-                    print(f"Error fetching Discord status: {e}")
-                    await asyncio.sleep(300)
+                    # A payload missing status or components (e.g. from a misconfigured stub) is a failed poll too
+                    snapshot = status_snapshot(await self.status_poller.fetch())
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, TypeError) as e:
+                    self.status_poller.failures += 1
+                    print(f"Error fetching Discord status: {e!r}")
+                    await asyncio.sleep(self.status_poller.next_delay())
                     continue
 
-                current_status = data['status']['description']
-                components = data['components']
-
-                for guild in self.bot.guilds:
-                    status_channel_id = await self.config.guild(guild).status_channel_id()
-                    if not status_channel_id:
-                        continue
-
-                    last_status = await self.config.guild(guild).last_status()
-
-                    if current_status != last_status:
-                        status_message = self.format_status_message(current_status, components)
-                        await self.post_update(guild, status_message)
-                        await self.config.guild(guild).last_status.set(current_status)
+                try:
+                    await self.broadcast_status(snapshot)
+                except Exception as e:
+                    # Any failure is logged and backed off, it must never end the poller for good
+                    self.status_poller.failures += 1
+                    print(f"Error broadcasting Discord status: {e!r}")
+                    traceback.print_exc()
+                else:
+                    self.status_poller.failures = 0
 
-                await asyncio.sleep(300)
+                await asyncio.sleep(self.status_poller.next_delay())
         except asyncio.CancelledError:
             print("Status checking task was cancelled.")
 
-    def format_status_message(self, status, components):
+    def format_status_message(self, snapshot, changes=()):
+        # Full report used by the pinned message in edit mode
         message = f"**Discord Status Update**\n\n"
-        message += f"**Status**: {status}\n\n"
-        for component in components:
-            if component['status'] != "operational":
-                message += f"**{component['name']}**: {component['status']}\n"
+        message += f"**Status**: {snapshot['description']}\n\n"
+        for name, status in snapshot['components'].values():
+            if status != "operational":
+                message += f"**{name}**: {status}\n"
+        if changes:
+            message += "\n**Latest changes**\n" + self.format_status_changes(changes)
+        message += f"\nLast updated <t:{int(time.time())}:R>"
         return message
 
-    async def post_update(self, guild, message):
-        channel_id = await self.config.guild(guild).status_channel_id()
+    def format_status_diff(self, snapshot, changes):
+        message = "**Discord Status Update**\n\n"
+        message += f"**Status**: {snapshot['description']}\n\n"
+        return message + self.format_status_changes(changes)
+
+    @staticmethod
+    def format_status_changes(changes):
+        return "".join(
+            f"**{name}**: {old_status or 'new'} \u2192 {new_status or 'removed'}\n"
+            for name, old_status, new_status in changes
+        )
+
+    async def broadcast_status(self, snapshot):
+        semaphore = asyncio.Semaphore(STATUS_FANOUT_CONCURRENCY)
+        delivered = []
+
+        async def deliver(guild_id, changes):
+            async with semaphore:
+                try:
+                    if guild_id in self._status_edit_mode:
+                        await self.edit_status_message(guild_id, self.format_status_message(snapshot, changes))
+                    else:
+                        await self.post_update(guild_id, self.format_status_diff(snapshot, changes))
+                except discord.HTTPException as e:
+                    # Left undelivered so the change is sent again on the next poll
+                    print(f"Error posting Discord status to guild {guild_id}: {e}")
+                else:
+                    delivered.append(guild_id)
+
+        deliveries = []
+        for guild_id in self._status_channels:
+            description_changed, changes = diff_status(self._last_status.get(guild_id), snapshot)
+            if description_changed or changes:
+                deliveries.append(deliver(guild_id, changes))
+        await asyncio.gather(*deliveries)
+
+        # last_status lives in memory, Config is only written once per guild per change
+        # Guilds left while the broadcast was running are skipped
+        delivered = [guild_id for guild_id in delivered if guild_id in self._status_channels]
+        for guild_id in delivered:
+            self._last_status[guild_id] = snapshot
+        await asyncio.gather(*(
+            self.config.guild_from_id(guild_id).last_status.set(snapshot) for guild_id in delivered
+        ))
+
+    async def post_update(self, guild_id, message):
+        channel_id = self._status_channels.get(guild_id)
         if channel := self.bot.get_channel(channel_id):
             await channel.send(message)
 
+    async def edit_status_message(self, guild_id, message):
+        channel = self.bot.get_channel(self._status_channels.get(guild_id))
+        if channel is None:
+            return
+        message_id = self._status_messages.get(guild_id)
+        if message_id:
+            try:
+                await channel.get_partial_message(message_id).edit(content=message)
+                return
+            except discord.NotFound:
+                pass
+        # No status message yet or it was deleted, post a new one and pin it
+        status_message = await channel.send(message)
+        with contextlib.suppress(discord.HTTPException):
+            await status_message.pin()
+        self._status_messages[guild_id] = status_message.id
+        await self.config.guild_from_id(guild_id).status_message_id.set(status_message.id)
+
     @commands.guild_only()
     @commands.admin_or_permissions(manage_guild=True)
     @commands.group(name="settings", invoke_without_command=True)
@@ -1136,9 +3121,32 @@ class VSMod(commands.Cog):
 
     @_settings.group(name="discord-status", invoke_without_command=True)
     async def _discord_status(self, ctx):
-        await ctx.send("Available discord-status commands: setstatuschannel")
+        await ctx.send("Available discord-status commands: setstatuschannel, editmode, setapiurl")
 
     @_discord_status.command(name="setstatuschannel")
     async def set_status_channel(self, ctx, channel: discord.TextChannel):
         await self.config.guild(ctx.guild).status_channel_id.set(channel.id)
+        self._status_channels[ctx.guild.id] = channel.id
+        self._last_status.setdefault(ctx.guild.id, await self.config.guild(ctx.guild).last_status())
+        self._status_messages.setdefault(ctx.guild.id, await self.config.guild(ctx.guild).status_message_id())
         await ctx.send(f"Discord status updates will be sent to {channel.mention}")
+
+    @_discord_status.command(name="editmode")
+    async def set_status_edit_mode(self, ctx, enabled: bool):
+        """Edit one pinned status message instead of posting every update."""
+        await self.config.guild(ctx.guild).status_edit_mode.set(enabled)
+        if enabled:
+            self._status_edit_mode.add(ctx.guild.id)
+            await ctx.send("Discord status updates will edit a single pinned message.")
+        else:
+            self._status_edit_mode.discard(ctx.guild.id)
+            await ctx.send("Discord status updates will be posted as new messages.")
+
+    @_discord_status.command(name="setapiurl")
+    @checks.is_owner()
+    async def set_status_api_url(self, ctx, url: str = None):
+        """Point the status poller at another status page API, or reset it to discordstatus.com."""
+        url = url or STATUS_API_URL
+        await self.config.status_api_url.set(url)
+        self.status_poller.set_base_url(url)
+        await ctx.send(f"Discord status will be polled from {url}")
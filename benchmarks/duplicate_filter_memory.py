@@ -0,0 +1,40 @@
+"""Memory used by the duplicate message filter at 10k messages per minute.
+
+Run from the repository root in the bot's environment:
+
+    python benchmarks/duplicate_filter_memory.py
+"""
+import tracemalloc
+
+from VSMod.vsmod import DuplicateDetector
+
+MESSAGES_PER_MINUTE = 10000
+THRESHOLD = 5
+WINDOW = 60
+
+
+def measure(fingerprint_for):
+    tracemalloc.start()
+    detector = DuplicateDetector(THRESHOLD, WINDOW)
+    interval = 60 / MESSAGES_PER_MINUTE
+    for i in range(MESSAGES_PER_MINUTE):
+        detector.check(fingerprint_for(i), i, i * interval)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak
+
+
+def main():
+    scenarios = (
+        ("all messages unique", lambda i: hash(f"message {i}")),
+        ("half of them one flooded line", lambda i: 1 if i % 2 else hash(f"message {i}")),
+        ("everyone posting the same line", lambda i: 1),
+    )
+    print(f"{MESSAGES_PER_MINUTE} messages over {WINDOW}s, threshold {THRESHOLD}")
+    for label, fingerprint_for in scenarios:
+        current, peak = measure(fingerprint_for)
+        print(f"{label:32} {current / 1024:8.0f} KiB held, {peak / 1024:8.0f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()